@@ -1,7 +1,7 @@
 # Generic modular configuration file manager.
 #
 # Author: Peter Odding <peter@peterodding.com>
-# Last Change: May 17, 2020
+# Last Change: October 18, 2026
 # URL: https://pypi.python.org/pypi/update-dotdee
 
 """
@@ -27,20 +27,33 @@ import glob
 import hashlib
 import logging
 import os
+import shutil
+import stat
+import zlib
+from multiprocessing.pool import ThreadPool
 
 # External dependencies.
 from executor.contexts import LocalContext
 from humanfriendly import format_path, parse_path
-from humanfriendly.text import compact, format, pluralize
+from humanfriendly.text import compact, concatenate, format, pluralize
 from natsort import natsort
 from property_manager import (
     PropertyManager,
     cached_property,
     mutable_property,
     required_property,
+    set_property,
 )
+from six import PY2
 from six.moves import configparser
 
+try:
+    # Python 3.5+ provides a fast directory iterator.
+    from os import scandir
+except ImportError:
+    # On Python 2.7 we fall back to the execution context.
+    scandir = None
+
 # Semi-standard module versioning.
 __version__ = '6.0'
 
@@ -57,11 +70,82 @@ user specific configuration files override system wide configuration files.
 .. _ini syntax: https://en.wikipedia.org/wiki/INI_file
 """
 
+COMPRESSED_READ_SCRIPT = (
+    'if [ "$(wc -c < "$1")" -ge "$2" ]; '
+    'then printf Z && gzip -c < "$1"; '
+    'else printf R && cat "$1"; fi'
+)
+"""
+Shell script used by :func:`UpdateDotDee.load_file()` to read compressed files (a string).
+
+The script is called with a pathname and :attr:`~UpdateDotDee.compression_threshold` as arguments.
+The first byte of the output indicates whether the remaining output is
+compressed (``Z``) or not (``R``).
+"""
+
+COMPRESSED_WRITE_SCRIPT = 'gzip -d > "$1"'
+"""Shell script used by :func:`UpdateDotDee.save_file()` to write compressed files (a string)."""
+
+DEFAULT_COMPRESSION_THRESHOLD = 1024 * 4
+"""The :attr:`~UpdateDotDee.compression_threshold` used by the command line interface (an integer, 4 KiB)."""
+
+STATUS_MODIFIED = 'modified'
+"""Returned by :func:`UpdateDotDee.check_file()` when the generated file contains local changes (a string)."""
+
+STATUS_STALE = 'stale'
+"""Returned by :func:`UpdateDotDee.check_file()` when the generated file needs to be updated (a string)."""
+
+STATUS_UP_TO_DATE = 'up-to-date'
+"""Returned by :func:`UpdateDotDee.check_file()` when the generated file is up to date (a string)."""
+
+PARSE_DEFAULT_SECTION = '\0defaults'
+"""The name of the defaults section used by :func:`ConfigLoader.parse_file()` (a string that never matches)."""
+
+WHITESPACE_BYTES = frozenset(b' \t\n\r\x0b\x0c'[i:i + 1] for i in range(6))
+"""The byte strings that :func:`trim_trailing_whitespace()` considers whitespace (a :class:`frozenset`)."""
+
 # Initialize a logger for this module.
 logger = logging.getLogger(__name__)
 
+# The property names of FastPropertyManager subclasses.
+property_names_cache = {}
+
+
+class FastPropertyManager(PropertyManager):
+
+    """
+    :class:`~property_manager.PropertyManager` with a low overhead initializer.
+
+    The initializer of :class:`~property_manager.PropertyManager` validates
+    keyword arguments and checks for missing required properties by
+    introspecting the object using :func:`dir()` on every construction, which
+    dominates the cost of creating short lived objects. The initializer of
+    :class:`FastPropertyManager` performs the same validation (raising the same
+    exceptions) using property names that are computed once per class.
+    """
+
+    def __init__(self, **kw):
+        """
+        Initialize a :class:`FastPropertyManager` object.
+
+        :param kw: Every keyword argument is used to assign a value to the
+                   property whose name matches the keyword argument.
+        :raises: :exc:`~exceptions.TypeError` when a keyword argument doesn't
+                 match a property or a required property is missing.
+        """
+        property_names, required_names = get_property_names(type(self))
+        for name, value in kw.items():
+            if name in property_names:
+                setattr(self, name, value)
+            else:
+                raise TypeError("got an unexpected keyword argument %r" % name)
+        missing_properties = [n for n in required_names if getattr(self, n, None) is None]
+        if missing_properties:
+            msg = "missing %s" % pluralize(len(missing_properties), "required argument")
+            raise TypeError("%s (%s)" % (msg, concatenate(missing_properties)))
+
 
-class UpdateDotDee(PropertyManager):
+class UpdateDotDee(FastPropertyManager):
 
     """
     The :class:`UpdateDotDee` class implements the Python API of `update-dotdee`.
@@ -72,11 +156,52 @@ class UpdateDotDee(PropertyManager):
     documentation of the :class:`~property_manager.PropertyManager` superclass.
     """
 
+    @mutable_property
+    def cache(self):
+        """
+        A :class:`~update_dotdee.cache.SnippetCache` object or :data:`None` (the default).
+
+        When this is set the contents of configuration snippets that are read
+        through :attr:`context` (i.e. when :attr:`direct_access` is
+        :data:`False`) are cached locally. The snippets are listed using a
+        single ``find -printf`` command (this requires GNU find on the system
+        that hosts the snippets) that reports the size, modification time and
+        inode number of each snippet, and only the snippets whose metadata
+        doesn't match a cache entry are read through :attr:`context`.
+        """
+
+    @cached_property
+    def cache_keys(self):
+        """
+        A dictionary that maps snippet pathnames to cache keys.
+
+        This dictionary is populated by :func:`find_snippets()` when
+        :attr:`cache` is set and consumed by :func:`read_file()`.
+        """
+        return {}
+
     @mutable_property
     def checksum_file(self):
         """The pathname of the file that stores the checksum of the generated file (a string)."""
         return os.path.join(self.directory, '.checksum')
 
+    @mutable_property
+    def compression_threshold(self):
+        """
+        The minimum size in bytes of compressed transfers (an integer or :data:`None`).
+
+        When this is set (it defaults to :data:`None`) files that are read and
+        written through :attr:`context` are transferred in gzip_ compressed
+        form, which can greatly reduce transfer times for repetitive text
+        files on slow network links. Files smaller than the given size are
+        transferred as is, because compressing them doesn't save enough to
+        justify the overhead. This requires the ``gzip`` program on the
+        system that hosts the files and has no effect when
+        :attr:`direct_access` is :data:`True`.
+
+        .. _gzip: https://en.wikipedia.org/wiki/Gzip
+        """
+
     @mutable_property(cached=True)
     def context(self):
         """
@@ -86,6 +211,24 @@ class UpdateDotDee(PropertyManager):
         """
         return LocalContext()
 
+    @mutable_property
+    def direct_access(self):
+        """
+        :data:`True` to access local files directly, :data:`False` to use :attr:`context`.
+
+        Every operation performed through :attr:`context` spawns an external
+        command, which adds up quickly when the ``.d`` directory contains
+        thousands of snippets. When :attr:`context` is a plain
+        :class:`~executor.contexts.LocalContext` that doesn't use ``sudo``
+        the snippets can be listed with a single :func:`os.scandir()` pass
+        and read using :func:`open()`, so that's what happens by default.
+        Executable snippets are still run through :attr:`context`.
+        """
+        if scandir is not None and type(self.context) is LocalContext:
+            options = self.context.get_options()
+            return not any(options.get(n) for n in ('sudo', 'uid', 'user'))
+        return False
+
     @mutable_property
     def directory(self):
         """The pathname of the directory with configuration snippets (a string)."""
@@ -100,6 +243,29 @@ class UpdateDotDee(PropertyManager):
         """:data:`True` to overwrite modified files, :data:`False` to abort (the default)."""
         return False
 
+    @mutable_property
+    def generations(self):
+        """
+        The number of generated files to retain for :func:`rollback()` (an integer, defaults to 0).
+
+        When this is a positive number :func:`update_file()` saves a copy of
+        each newly generated file in :attr:`generations_directory` and removes
+        the oldest copies so that at most :attr:`generations` copies remain.
+        """
+        return 0
+
+    @mutable_property
+    def generations_directory(self):
+        """
+        The pathname of the directory with retained generations (a string).
+
+        Defaults to ``.generations`` in :attr:`directory` (the directory is
+        hidden so that it's ignored by :func:`find_snippets()`). Each file in
+        the directory is named after a sequence number and the checksum of
+        the generated file (separated by a dash).
+        """
+        return os.path.join(self.directory, '.generations')
+
     @property
     def new_checksum(self):
         """Get the SHA1 digest of the contents of :attr:`filename` (a string)."""
@@ -107,7 +273,7 @@ class UpdateDotDee(PropertyManager):
             friendly_name = format_path(self.filename)
             logger.debug("Calculating SHA1 of %s ..", friendly_name)
             context = hashlib.sha1()
-            context.update(self.context.read_file(self.filename))
+            context.update(self.load_file(self.filename))
             checksum = context.hexdigest()
             logger.debug("The SHA1 digest of %s is %s.", friendly_name, checksum)
             return checksum
@@ -121,6 +287,21 @@ class UpdateDotDee(PropertyManager):
             logger.debug("Saved checksum is %s.", checksum)
             return checksum
 
+    @mutable_property
+    def read_concurrency(self):
+        """
+        The maximum number of snippets to read concurrently (an integer, defaults to 1).
+
+        On filesystems where every read waits for a network round trip (for
+        example NFS) reading snippets one at a time is latency bound. When
+        :attr:`read_concurrency` is greater than one and :attr:`context` is a
+        :class:`~executor.contexts.LocalContext`, :func:`generate_contents()`
+        reads snippets using a pool of threads that prefetches snippets ahead
+        of the (natural) order in which the contents are concatenated.
+        Executable snippets are still executed one at a time and in order.
+        """
+        return 1
+
     def update_file(self, force=None):
         """
         Update the file with the contents of the files in the ``.d`` directory.
@@ -141,76 +322,333 @@ class UpdateDotDee(PropertyManager):
             logger.info("Moving %s to %s ..", format_path(self.filename), format_path(local_file))
             self.context.execute('mv', self.filename, local_file, tty=False)
         # Read the modular configuration file(s).
-        blocks = []
-        for entry in natsort(self.context.list_entries(self.directory)):
-            if not entry.startswith('.'):
-                filename = os.path.join(self.directory, entry)
-                if self.context.is_executable(filename):
-                    blocks.append(self.execute_file(filename))
-                else:
-                    blocks.append(self.read_file(filename))
-        contents = b"\n\n".join(blocks)
+        contents = self.generate_contents()
         # Make sure the generated file was not modified? We skip this on the
         # first run, when the original file was just moved into the newly
         # created directory (see above).
         if all(map(self.context.is_file, (self.filename, self.checksum_file))):
             logger.info("Checking for local changes to %s ..", format_path(self.filename))
             if self.new_checksum != self.old_checksum:
-                if force:
-                    logger.warning(compact(
-                        """
-                        The contents of the file to generate ({filename})
-                        were modified but --force was used so overwriting
-                        anyway!
-                        """,
-                        filename=format_path(self.filename),
-                    ))
-                else:
-                    raise RefuseToOverwrite(compact(
-                        """
-                        The contents of the file to generate ({filename})
-                        were modified and I'm refusing to overwrite it! If
-                        you're sure you want to proceed, use the --force
-                        option or delete the file {checksum_file} and
-                        retry.
-                        """,
-                        filename=format_path(self.filename),
-                        checksum_file=format_path(self.checksum_file),
-                    ))
+                self.handle_local_changes(force)
         # Update the generated configuration file.
-        self.write_file(self.filename, contents)
+        checksum = self.write_file(self.filename, contents)
         # Update the checksum file.
-        self.context.write_file(self.checksum_file, self.new_checksum)
+        self.context.write_file(self.checksum_file, checksum)
+        # Retain a copy of the generated file?
+        if self.generations > 0:
+            self.save_generation(checksum)
+        # Enforce the size limit of the snippet cache.
+        if self.cache and self.cache_keys:
+            self.cache.evict()
+
+    def check_file(self):
+        """
+        Check whether :attr:`filename` is up to date without changing anything.
+
+        :returns: One of the strings :data:`STATUS_UP_TO_DATE`,
+                  :data:`STATUS_STALE` or :data:`STATUS_MODIFIED`.
+
+        The checks are ordered from cheap to expensive: The existence of
+        :attr:`directory` and :attr:`filename` is checked first and the
+        saved checksum is read (see :func:`read_checksum()`), then
+        :attr:`filename` is compared to the saved checksum to detect local
+        changes and only then are the snippets in :attr:`directory` read
+        (and executed) to find out whether :attr:`filename` needs to be
+        regenerated.
+        """
+        if self.direct_access:
+            directory_exists = os.path.isdir(self.directory)
+            file_exists = directory_exists and os.path.isfile(self.filename)
+        else:
+            directory_exists = self.context.is_directory(self.directory)
+            file_exists = directory_exists and self.context.is_file(self.filename)
+        if not directory_exists:
+            logger.info("Directory %s doesn't exist yet.", format_path(self.directory))
+            return STATUS_STALE
+        old_checksum = self.read_checksum() if file_exists else None
+        if not old_checksum:
+            logger.info("File %s hasn't been generated yet.", format_path(self.filename))
+            return STATUS_STALE
+        if hashlib.sha1(self.load_file(self.filename)).hexdigest() != old_checksum:
+            logger.info("File %s contains local changes.", format_path(self.filename))
+            return STATUS_MODIFIED
+        if compute_checksum(self.generate_contents()) != old_checksum:
+            logger.info("File %s needs to be updated.", format_path(self.filename))
+            return STATUS_STALE
+        logger.info("File %s is up to date.", format_path(self.filename))
+        return STATUS_UP_TO_DATE
+
+    def find_generations(self):
+        """
+        Find the retained generations of :attr:`filename`.
+
+        :returns: A list of tuples with three values each: The sequence
+                  number of a generation (an integer), the pathname of the
+                  file in :attr:`generations_directory` (a string) and the
+                  checksum of the file (a string). The list is sorted from
+                  oldest to newest generation.
+        """
+        if self.direct_access:
+            entries = os.listdir(self.generations_directory) if os.path.isdir(self.generations_directory) else []
+        elif self.context.is_directory(self.generations_directory):
+            entries = self.context.list_entries(self.generations_directory)
+        else:
+            entries = []
+        generations = []
+        for entry in entries:
+            sequence, _, checksum = entry.partition('-')
+            if sequence.isdigit() and len(checksum) == 40:
+                generations.append((int(sequence), os.path.join(self.generations_directory, entry), checksum))
+        return sorted(generations)
+
+    def generate_contents(self):
+        """
+        Generate the contents of :attr:`filename`.
+
+        :returns: The contents of the snippets in :attr:`directory` separated
+                  by blank lines (a byte string). Executable snippets are
+                  executed and contribute their output instead.
+        """
+        snippets = self.find_snippets()
+        if self.read_concurrency > 1 and len(snippets) > 1 and isinstance(self.context, LocalContext):
+            logger.debug("Reading snippets using %s ..", pluralize(self.read_concurrency, "thread"))
+            pool = ThreadPool(min(self.read_concurrency, len(snippets)))
+            try:
+                # ThreadPool.imap() yields results in order while the threads
+                # work ahead, so the blocks are consumed as soon as possible.
+                prefetched = pool.imap(self.prefetch_file, snippets)
+                blocks = [
+                    self.execute_file(filename) if executable else contents
+                    for (filename, executable), contents in zip(snippets, prefetched)
+                ]
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            blocks = [
+                self.execute_file(filename) if executable else self.read_file(filename)
+                for filename, executable in snippets
+            ]
+        return b"\n\n".join(blocks)
+
+    def prefetch_file(self, snippet):
+        """
+        Read a snippet on behalf of :func:`generate_contents()`.
+
+        :param snippet: One of the tuples returned by :func:`find_snippets()`.
+        :returns: The result of :func:`read_file()` or :data:`None` for
+                  executable snippets.
+        """
+        filename, executable = snippet
+        return None if executable else self.read_file(filename)
+
+    def handle_local_changes(self, force):
+        """
+        Handle local changes to the contents of :attr:`filename`.
+
+        :param force: :data:`True` to log a warning, :data:`False` to raise
+                      an exception.
+        :raises: :exc:`RefuseToOverwrite` when `force` is :data:`False`.
+        """
+        if force:
+            logger.warning(compact(
+                """
+                The contents of the file to generate ({filename})
+                were modified but --force was used so overwriting
+                anyway!
+                """,
+                filename=format_path(self.filename),
+            ))
+        else:
+            raise RefuseToOverwrite(compact(
+                """
+                The contents of the file to generate ({filename})
+                were modified and I'm refusing to overwrite it! If
+                you're sure you want to proceed, use the --force
+                option or delete the file {checksum_file} and
+                retry.
+                """,
+                filename=format_path(self.filename),
+                checksum_file=format_path(self.checksum_file),
+            ))
+
+    def find_snippets(self):
+        """
+        Find the configuration snippets in :attr:`directory`.
+
+        :returns: A list of tuples with two values each: The pathname of a
+                  snippet (a string) and a boolean that indicates whether the
+                  snippet is executable. The list is sorted in natural order
+                  and excludes hidden files.
+        """
+        snippets = {}
+        if self.direct_access:
+            for entry in scandir(self.directory):
+                if not entry.name.startswith('.'):
+                    # Only snippets with one or more execute bits set need the
+                    # additional access() call to mirror the semantics of
+                    # `test -x', all other snippets are decided by one stat().
+                    executable = bool(entry.stat().st_mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH))
+                    snippets[entry.name] = executable and os.access(entry.path, os.X_OK)
+        elif self.cache:
+            # List the snippets including their executability and the
+            # metadata needed to generate cache keys using one command.
+            listing = self.context.capture(
+                'find', self.directory, '-mindepth', '1', '-maxdepth', '1',
+                '(', '-executable', '-printf', 'x\\0', '-o', '-printf', '-\\0', ')',
+                '-printf', '%f\\0%s\\0%T@\\0%i\\0',
+            )
+            fields = listing.split('\0')
+            for offset in range(0, len(fields) - 1, 5):
+                flag, entry, size, mtime, inode = fields[offset:offset + 5]
+                if not entry.startswith('.'):
+                    filename = os.path.join(self.directory, entry)
+                    snippets[entry] = (flag == 'x')
+                    self.cache_keys[filename] = self.cache.get_key(str(self.context), filename, size, mtime, inode)
+        else:
+            for entry in self.context.list_entries(self.directory):
+                if not entry.startswith('.'):
+                    filename = os.path.join(self.directory, entry)
+                    snippets[entry] = self.context.is_executable(filename)
+        return [(os.path.join(self.directory, entry), snippets[entry]) for entry in natsort(snippets)]
 
     def read_file(self, filename):
         """
         Read a text file and provide feedback to the user.
 
         :param filename: The pathname of the file to read (a string).
-        :returns: The contents of the file (a string).
+        :returns: The contents of the file without trailing whitespace (the
+                  result of :func:`trim_trailing_whitespace()`).
         """
-        logger.info("Reading file: %s", format_path(filename))
-        contents = self.context.read_file(filename)
-        num_lines = len(contents.splitlines())
-        logger.debug("Read %s from %s.",
-                     pluralize(num_lines, 'line'),
-                     format_path(filename))
-        return contents.rstrip()
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Reading file: %s", format_path(filename))
+        key = self.cache_keys.get(filename) if self.cache else None
+        contents = self.cache.get(key) if key else None
+        if contents is not None:
+            logger.debug("Using cached contents of %s.", format_path(filename))
+        else:
+            contents = self.load_file(filename)
+            if key:
+                self.cache.put(key, contents)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Read %s from %s.",
+                         pluralize(count_lines(contents), 'line'),
+                         format_path(filename))
+        return trim_trailing_whitespace(contents)
 
     def execute_file(self, filename):
         """
         Execute a file and provide feedback to the user.
 
         :param filename: The pathname of the file to execute (a string).
-        :returns: Whatever the executed file returns on stdout (a string).
+        :returns: Whatever the executed file returns on stdout without
+                  trailing whitespace (the result of
+                  :func:`trim_trailing_whitespace()`).
         """
-        logger.info("Executing file: %s", format_path(filename))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Executing file: %s", format_path(filename))
         contents = self.context.execute(filename, capture=True).stdout
-        num_lines = len(contents.splitlines())
-        logger.debug("Execution of %s yielded % of output.",
-                     format_path(filename),
-                     pluralize(num_lines, 'line'))
-        return contents.rstrip()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Execution of %s yielded %s of output.",
+                         format_path(filename),
+                         pluralize(count_lines(contents), 'line'))
+        return trim_trailing_whitespace(contents)
+
+    def read_checksum(self):
+        """
+        Read :attr:`checksum_file` using a single operation.
+
+        :returns: The saved checksum (a string) or :data:`None` when
+                  :attr:`checksum_file` doesn't exist (or is empty).
+
+        Unlike :attr:`old_checksum` this doesn't check whether the file exists
+        before reading it, which saves a round trip for remote contexts.
+        """
+        if self.direct_access:
+            try:
+                with open(self.checksum_file, 'rb') as handle:
+                    return handle.read().decode('ascii').strip() or None
+            except (IOError, OSError):
+                return None
+        return self.context.capture('cat', self.checksum_file, check=False, silent=True, tty=False) or None
+
+    def rollback(self, force=None):
+        """
+        Replace :attr:`filename` with the previous retained generation.
+
+        :param force: Override the value of :attr:`force` (a boolean or
+                      :data:`None`).
+        :returns: The sequence number of the restored generation (an integer).
+        :raises: :exc:`RefuseToOverwrite` when :attr:`force` is :data:`False`
+                 and the contents of :attr:`filename` were modified,
+                 :exc:`NoPreviousGeneration` when there's no generation
+                 to roll back to.
+
+        The generation that precedes the one matching the saved checksum is
+        restored (when the saved checksum doesn't match any generation the
+        newest generation is restored). The generation is copied next to
+        :attr:`filename` and then swapped into place by a single rename, so
+        other processes see either the old or the new contents. Retained
+        generations are left intact, so repeated rollbacks move further back.
+        """
+        if force is None:
+            force = self.force
+        generations = self.find_generations()
+        old_checksum = self.old_checksum
+        index = len(generations)
+        for i, (sequence, pathname, checksum) in enumerate(generations):
+            if checksum == old_checksum:
+                index = i
+        if index == 0:
+            raise NoPreviousGeneration(format(
+                "There's no generation of %s to roll back to!",
+                format_path(self.filename),
+            ))
+        sequence, pathname, checksum = generations[index - 1]
+        if old_checksum and self.context.is_file(self.filename) and self.new_checksum != old_checksum:
+            self.handle_local_changes(force)
+        logger.info("Rolling back %s to generation %i ..", format_path(self.filename), sequence)
+        temporary_file = '%s.rollback-%i' % (self.filename, os.getpid())
+        if self.direct_access:
+            shutil.copy2(pathname, temporary_file)
+            os.rename(temporary_file, self.filename)
+        else:
+            self.context.execute('cp', '-p', pathname, temporary_file, tty=False)
+            self.context.execute('mv', temporary_file, self.filename, tty=False)
+        self.context.write_file(self.checksum_file, checksum)
+        return sequence
+
+    def save_generation(self, checksum):
+        """
+        Retain a copy of :attr:`filename` in :attr:`generations_directory`.
+
+        :param checksum: The checksum of :attr:`filename` (a string).
+
+        Nothing is saved when the newest generation has the same checksum.
+        The oldest generations are removed so that at most
+        :attr:`generations` generations remain.
+        """
+        generations = self.find_generations()
+        if generations and generations[-1][2] == checksum:
+            return
+        sequence = generations[-1][0] + 1 if generations else 1
+        pathname = os.path.join(self.generations_directory, '%i-%s' % (sequence, checksum))
+        expired = [g[1] for g in generations[:max(0, len(generations) + 1 - self.generations)]]
+        logger.info("Saving generation %i of %s ..", sequence, format_path(self.filename))
+        if self.direct_access:
+            if not generations and not os.path.isdir(self.generations_directory):
+                os.mkdir(self.generations_directory)
+            shutil.copy2(self.filename, pathname)
+            for expired_file in expired:
+                os.unlink(expired_file)
+        else:
+            if not generations:
+                self.context.execute('mkdir', '-p', self.generations_directory, tty=False)
+            self.context.execute('cp', '-p', self.filename, pathname, tty=False)
+            if expired:
+                self.context.execute('rm', '-f', *expired, tty=False)
+        if expired:
+            logger.debug("Removed %s.", pluralize(len(expired), "expired generation"))
 
     def write_file(self, filename, contents):
         """
@@ -218,16 +656,77 @@ class UpdateDotDee(PropertyManager):
 
         :param filename: The pathname of the file to write (a string).
         :param contents: The new contents of the file (a string).
+        :returns: The SHA1 digest of the written contents (the result of
+                  :func:`compute_checksum()`).
+
+        Trailing whitespace is replaced by a single newline.
+        """
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Writing file: %s", format_path(filename))
+        trimmed = trim_trailing_whitespace(contents)
+        if self.direct_access:
+            # Write the trimmed contents and the newline separately
+            # to avoid creating a copy of the (possibly huge) contents.
+            with open(filename, 'wb') as handle:
+                handle.write(trimmed)
+                handle.write(b"\n")
+        else:
+            self.save_file(filename, b"".join((trimmed, b"\n")))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Wrote %s to %s.",
+                         pluralize(count_lines(contents, len(trimmed)) or 1, "line"),
+                         format_path(filename))
+        return compute_checksum(trimmed)
+
+    def load_file(self, filename):
+        """
+        Get the contents of a file.
+
+        :param filename: The pathname of the file to read (a string).
+        :returns: The contents of the file (a byte string).
+
+        The file is read directly (see :attr:`direct_access`), in compressed
+        form (see :attr:`compression_threshold`) or using :attr:`context`.
         """
-        logger.info("Writing file: %s", format_path(filename))
-        contents = contents.rstrip() + b"\n"
-        self.context.write_file(filename, contents)
-        logger.debug("Wrote %s to %s.",
-                     pluralize(len(contents.splitlines()), "line"),
-                     format_path(filename))
+        if self.direct_access:
+            with open(filename, 'rb') as handle:
+                return handle.read()
+        elif self.compression_threshold is not None:
+            output = self.context.execute(
+                'sh', '-c', COMPRESSED_READ_SCRIPT, 'sh',
+                filename, str(self.compression_threshold),
+                capture=True, tty=False,
+            ).stdout
+            if output[:1] == b"Z":
+                # On Python 2 zlib.decompress() doesn't accept memoryview objects.
+                compressed = output[1:] if PY2 else memoryview(output)[1:]
+                contents = zlib.decompress(compressed, 16 + zlib.MAX_WBITS)
+                logger.debug("Received %s in %i compressed bytes.", pluralize(len(contents), "byte"), len(output) - 1)
+                return contents
+            return output[1:]
+        else:
+            return self.context.read_file(filename)
+
+    def save_file(self, filename, contents):
+        """
+        Change the contents of a file.
 
+        :param filename: The pathname of the file to write (a string).
+        :param contents: The new contents of the file (a byte string).
 
-class ConfigLoader(PropertyManager):
+        The file is written using :attr:`context`, in compressed form when
+        :attr:`compression_threshold` is set and the contents are large enough.
+        """
+        if self.compression_threshold is not None and len(contents) >= self.compression_threshold:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            compressed = compressor.compress(contents) + compressor.flush()
+            logger.debug("Sending %s in %i compressed bytes.", pluralize(len(contents), "byte"), len(compressed))
+            self.context.execute('sh', '-c', COMPRESSED_WRITE_SCRIPT, 'sh', filename, input=compressed, tty=False)
+        else:
+            self.context.write_file(filename, contents)
+
+
+class ConfigLoader(FastPropertyManager):
 
     """
     Wrapper for :mod:`configparser` that searches ``*.d`` directories.
@@ -263,6 +762,7 @@ class ConfigLoader(PropertyManager):
         for pattern in self.filename_patterns:
             logger.debug("Matching filename pattern: %s", pattern)
             matches.extend(natsort(glob.glob(parse_path(pattern))))
+        self.matched_files = matches
         return matches
 
     @mutable_property(cached=True)
@@ -320,6 +820,20 @@ class ConfigLoader(PropertyManager):
         ])
         return format(DOCUMENTATION_TEMPLATE, table=formatted_table).strip()
 
+    @cached_property(repr=False)
+    def file_parser(self):
+        """
+        The :class:`configparser.RawConfigParser` object used by :func:`parse_file()`.
+
+        This parser is reused for every file because constructing a parser is
+        relatively expensive. On Python 3 the ``DEFAULT`` section is parsed
+        as a regular section so that the options of other sections don't
+        include the defaults.
+        """
+        if PY2:
+            return configparser.RawConfigParser()
+        return configparser.RawConfigParser(default_section=PARSE_DEFAULT_SECTION)
+
     @mutable_property
     def filename_extension(self):
         """The filename extension of configuration files (a string, defaults to ``.ini``)."""
@@ -354,16 +868,62 @@ class ConfigLoader(PropertyManager):
             patterns.append(self.get_modular_pattern(directory))
         return patterns
 
+    @mutable_property(repr=False)
+    def matched_files(self):
+        """
+        The result of the most recent search for configuration files (a list of strings or :data:`None`).
+
+        This enables :func:`refresh()` to distinguish between a value of
+        :attr:`available_files` that was computed (and should be recomputed)
+        and a value that was set by the caller.
+        """
+
+    @cached_property(repr=False)
+    def parsed_files(self):
+        """
+        The parsed contents of configuration files (a dictionary).
+
+        The keys of the dictionary are filenames and the values are tuples
+        with two values: The signature of the file (see :func:`get_signature()`)
+        and the result of :func:`parse_file()`. Entries are reused by
+        :attr:`parser` as long as the signature of the file doesn't change.
+        """
+        return {}
+
     @cached_property(repr=False)
     def parser(self):
-        """A :class:`configparser.RawConfigParser` object with :attr:`available_files` loaded."""
+        """
+        A :class:`configparser.RawConfigParser` object with :attr:`available_files` loaded.
+
+        The configuration files are parsed individually (refer to
+        :attr:`parsed_files`) and then merged in the order given by
+        :attr:`available_files`, so that later files override earlier files.
+        """
         parser = configparser.RawConfigParser()
+        parsed_files = {}
         for filename in self.available_files:
             friendly_name = format_path(filename)
-            logger.debug("Loading configuration file: %s", friendly_name)
-            loaded_files = parser.read(filename)
-            if len(loaded_files) == 0:
-                self.report_issue("Failed to load configuration file! (%s)", friendly_name)
+            signature = get_signature(filename)
+            if signature is not None and self.parsed_files.get(filename, (None,))[0] == signature:
+                logger.debug("Reusing parsed configuration file: %s", friendly_name)
+                parsed_files[filename] = self.parsed_files[filename]
+            else:
+                logger.debug("Loading configuration file: %s", friendly_name)
+                contents = self.parse_file(filename) if signature is not None else None
+                if contents is None:
+                    self.report_issue("Failed to load configuration file! (%s)", friendly_name)
+                    continue
+                parsed_files[filename] = (signature, contents)
+            defaults, sections = parsed_files[filename][1]
+            for name, value in defaults:
+                parser.set(configparser.DEFAULTSECT, name, value)
+            for section_name, options in sections:
+                if not parser.has_section(section_name):
+                    parser.add_section(section_name)
+                for name, value in options:
+                    parser.set(section_name, name, value)
+        # Forget about files that are no longer available.
+        set_property(self, 'parsed_files', parsed_files)
         logger.debug("Loaded %s from %s.",
                      pluralize(len(parser.sections()), "section"),
                      pluralize(len(self.available_files), "configuration file"))
@@ -463,6 +1023,68 @@ class ConfigLoader(PropertyManager):
         """
         return '.' if directory == '~' else ''
 
+    def save_snapshot(self, filename):
+        """
+        Save the loaded configuration as an immutable snapshot.
+
+        :param filename: The pathname of the snapshot (a string).
+        :returns: A :class:`~update_dotdee.snapshot.ConfigSnapshot` object.
+
+        Refer to :mod:`update_dotdee.snapshot` for details.
+        """
+        from update_dotdee.snapshot import ConfigSnapshot, write_snapshot
+        write_snapshot(dict((n, self.get_options(n)) for n in self.section_names), filename)
+        return ConfigSnapshot(filename=filename)
+
+    def parse_file(self, filename):
+        """
+        Parse a single configuration file.
+
+        :param filename: The pathname of the configuration file (a string).
+        :returns: A tuple with two values: A list of (name, value) tuples with
+                  the options in the ``DEFAULT`` section and a list of
+                  (section_name, options) tuples where `options` is a list of
+                  (name, value) tuples. If the file can't be read :data:`None`
+                  is returned.
+        """
+        parser = self.file_parser
+        try:
+            if not parser.read(filename):
+                return None
+            defaults = list(parser.defaults().items())
+            sections = []
+            for section_name in parser.sections():
+                if PY2:
+                    options = [(n, v) for n, v in parser._sections[section_name].items() if n != '__name__']
+                else:
+                    options = [(n, parser.get(section_name, n)) for n in parser.options(section_name)]
+                if section_name == configparser.DEFAULTSECT:
+                    defaults.extend(options)
+                else:
+                    sections.append((section_name, options))
+            return defaults, sections
+        finally:
+            parser.defaults().clear()
+            for section_name in parser.sections():
+                parser.remove_section(section_name)
+
+    def refresh(self):
+        """
+        Reload the configuration, re-parsing only the files that changed.
+
+        :returns: The value of :attr:`parser`.
+
+        When :attr:`available_files` was computed (rather than set by the
+        caller) the search for available configuration files is repeated, so
+        that added and removed files are noticed. Files whose signature (see
+        :func:`get_signature()`) didn't change aren't parsed again.
+        """
+        if self.matched_files is not None and self.available_files is self.matched_files:
+            del self.available_files
+        del self.parser
+        del self.section_names
+        return self.parser
+
     def report_issue(self, message, *args, **kw):
         """Handle a problem by raising an exception or logging a warning (depending on :attr:`strict`)."""
         if self.strict:
@@ -471,11 +1093,111 @@ class ConfigLoader(PropertyManager):
             logger.warning(format(message, *args, **kw))
 
 
+class NoPreviousGeneration(Exception):
+
+    """Raised by :func:`UpdateDotDee.rollback()` when there's no generation to roll back to."""
+
+
 class RefuseToOverwrite(Exception):
 
     """Raised when `update-dotdee` notices that a generated file was modified."""
 
 
+def compute_checksum(contents):
+    """
+    Calculate the checksum of a generated file.
+
+    :param contents: The contents of the file (a byte string).
+    :returns: The SHA1 digest of the contents as written by
+              :func:`UpdateDotDee.write_file()` (a string).
+    """
+    checksum = hashlib.sha1(trim_trailing_whitespace(contents))
+    checksum.update(b"\n")
+    return checksum.hexdigest()
+
+
+def count_lines(data, end=None):
+    """
+    Count the number of lines in a byte string.
+
+    :param data: A byte string.
+    :param end: The offset where counting stops (an integer, defaults to
+                the length of `data`).
+    :returns: The number of lines (an integer).
+
+    The result is the same as ``len(data[:end].splitlines())`` for byte
+    strings with UNIX line endings, but no copies or lists are allocated.
+    """
+    if end is None:
+        end = len(data)
+    count = data.count(b"\n", 0, end)
+    if end > 0 and data[end - 1:end] != b"\n":
+        count += 1
+    return count
+
+
+def trim_trailing_whitespace(data):
+    """
+    Remove trailing whitespace from a byte string without copying it.
+
+    :param data: A byte string.
+    :returns: The given byte string when it doesn't end in whitespace,
+              otherwise a :class:`memoryview` of the byte string that
+              excludes the trailing whitespace.
+
+    The result is equivalent to ``data.rstrip()`` but for multi-megabyte
+    snippets this avoids doubling the peak memory usage. The result can be
+    passed to :func:`bytes.join()` or written to a file as is.
+    """
+    end = len(data)
+    while end > 0 and data[end - 1:end] in WHITESPACE_BYTES:
+        end -= 1
+    if end == len(data):
+        return data
+    elif PY2:
+        # On Python 2 byte strings can't be joined with memoryview objects.
+        return data[:end]
+    else:
+        return memoryview(data)[:end]
+
+
+def get_property_names(cls):
+    """
+    Get the property names of a class.
+
+    :param cls: A :class:`~property_manager.PropertyManager` subclass.
+    :returns: A tuple with two values: A :class:`frozenset` with the names of
+              all properties and a sorted tuple with the names of required
+              and/or key properties.
+    """
+    names = property_names_cache.get(cls)
+    if names is None:
+        properties = dict((n, getattr(cls, n, None)) for n in dir(cls))
+        properties = dict((n, p) for n, p in properties.items() if isinstance(p, property))
+        names = (frozenset(properties), tuple(sorted(
+            n for n, p in properties.items()
+            if getattr(p, 'required', False) or getattr(p, 'key', False)
+        )))
+        property_names_cache[cls] = names
+    return names
+
+
+def get_signature(filename):
+    """
+    Get the signature of a file, used to detect changes.
+
+    :param filename: The pathname of the file (a string).
+    :returns: A tuple with the modification time (in nanoseconds where
+              available), size and inode number of the file, or :data:`None`
+              when the file doesn't exist.
+    """
+    try:
+        metadata = os.stat(filename)
+    except OSError:
+        return None
+    return (getattr(metadata, 'st_mtime_ns', metadata.st_mtime), metadata.st_size, metadata.st_ino)
+
+
 def inject_documentation(**options):
     """
     Generate configuration documentation in reStructuredText_ syntax.
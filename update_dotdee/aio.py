@@ -0,0 +1,358 @@
+# Generic modular configuration file manager.
+#
+# Author: Peter Odding <peter@peterodding.com>
+# Last Change: October 18, 2026
+# URL: https://pypi.python.org/pypi/update-dotdee
+
+"""
+Asynchronous API for `update-dotdee` based on :mod:`asyncio`.
+
+The classes in this module are subclasses of :class:`~update_dotdee.UpdateDotDee`
+and :class:`~update_dotdee.ConfigLoader` whose blocking operations are
+available as coroutines, so that a single event loop can drive hundreds of
+concurrent updates without dedicating a thread to each target:
+
+- External commands (for example on remote systems accessed over SSH) are
+  started using :func:`asyncio.create_subprocess_exec()` based on the command
+  lines prepared by the execution context, so options like ``sudo`` and
+  ``ssh`` are respected exactly like in the synchronous API.
+
+- Local files (refer to :attr:`~update_dotdee.UpdateDotDee.direct_access`)
+  are read by offloading the blocking calls to the default executor of the
+  event loop.
+
+Here's an example that updates the same file on several remote systems:
+
+.. code-block:: python
+
+   import asyncio
+   from executor.contexts import RemoteContext
+   from update_dotdee.aio import AsyncUpdateDotDee
+
+   async def update_hosts_files(*ssh_aliases):
+       await asyncio.gather(*(
+           AsyncUpdateDotDee(
+               context=RemoteContext(ssh_alias=alias, sudo=True),
+               filename='/etc/hosts',
+           ).update_file()
+           for alias in ssh_aliases
+       ))
+
+   asyncio.run(update_hosts_files('server-1', 'server-2', 'server-3'))
+
+This module requires Python 3.5 or newer.
+"""
+
+# Standard library modules.
+import asyncio
+import hashlib
+import logging
+import os
+import subprocess
+
+# External dependencies.
+from executor import ExternalCommandFailed, quote
+from humanfriendly import format_path
+from humanfriendly.text import format, pluralize
+from natsort import natsort
+from property_manager import mutable_property, set_property
+from six.moves import configparser
+
+# Modules included in our package.
+from update_dotdee import ConfigLoader, UpdateDotDee, count_lines, trim_trailing_whitespace
+
+DEFAULT_CONCURRENCY = 10
+"""The default maximum number of concurrent operations per object (an integer)."""
+
+# Initialize a logger for this module.
+logger = logging.getLogger(__name__)
+
+
+class AsyncUpdateDotDee(UpdateDotDee):
+
+    """
+    Asynchronous variant of :class:`~update_dotdee.UpdateDotDee`.
+
+    The :func:`update_file()`, :func:`find_snippets()`, :func:`read_file()`,
+    :func:`execute_file()` and :func:`write_file()` methods are coroutines.
+    The configuration snippets are read and executed concurrently (limited
+    by :attr:`concurrency`) while the order of the generated contents is
+    preserved.
+
+    Retained generations (refer to :attr:`~update_dotdee.UpdateDotDee.generations`)
+    are saved by offloading :func:`~update_dotdee.UpdateDotDee.save_generation()`
+    to the default executor. The :attr:`~update_dotdee.UpdateDotDee.cache`,
+    :attr:`~update_dotdee.UpdateDotDee.compression_threshold` and
+    :attr:`~update_dotdee.UpdateDotDee.read_concurrency` properties are not
+    supported by this class (setting them has no effect).
+    """
+
+    @mutable_property
+    def concurrency(self):
+        """The maximum number of concurrent snippet operations (an integer, defaults to :data:`DEFAULT_CONCURRENCY`)."""
+        return DEFAULT_CONCURRENCY
+
+    async def update_file(self, force=None):
+        """
+        Update the file with the contents of the files in the ``.d`` directory.
+
+        :param force: Override the value of :attr:`force` (a boolean or
+                      :data:`None`).
+        :raises: :exc:`~update_dotdee.RefuseToOverwrite` when :attr:`force` is
+                 :data:`False` and the contents of :attr:`filename` were
+                 modified.
+        """
+        if force is None:
+            force = self.force
+        if not await self.test('test', '-d', self.directory):
+            # Create the .d directory.
+            logger.info("Creating directory %s ..", format_path(self.directory))
+            await self.capture('mkdir', '-p', self.directory)
+            # Move the original file into the .d directory.
+            local_file = os.path.join(self.directory, 'local')
+            logger.info("Moving %s to %s ..", format_path(self.filename), format_path(local_file))
+            await self.capture('mv', self.filename, local_file)
+        # Read the modular configuration file(s) concurrently.
+        snippets = await self.find_snippets()
+        blocks = await gather_limited(self.concurrency, *(
+            self.execute_file(filename) if executable else self.read_file(filename)
+            for filename, executable in snippets
+        ))
+        contents = b"\n\n".join(blocks)
+        # Make sure the generated file was not modified?
+        have_file, have_checksum = await asyncio.gather(
+            self.test('test', '-f', self.filename),
+            self.test('test', '-f', self.checksum_file),
+        )
+        if have_file and have_checksum:
+            logger.info("Checking for local changes to %s ..", format_path(self.filename))
+            new_checksum, old_checksum = await asyncio.gather(
+                self.capture('cat', self.filename),
+                self.capture('cat', self.checksum_file),
+            )
+            if hashlib.sha1(new_checksum).hexdigest() != old_checksum.decode('ascii'):
+                self.handle_local_changes(force)
+        # Update the generated configuration file and the checksum file.
+        checksum = await self.write_file(self.filename, contents)
+        await self.capture('cat > %s' % quote(self.checksum_file), input=checksum.encode('ascii'), shell=True)
+        # Retain a copy of the generated file?
+        if self.generations > 0:
+            await offload(self.save_generation, checksum)
+
+    async def find_snippets(self):
+        """
+        Find the configuration snippets in :attr:`directory`.
+
+        :returns: The same value as :func:`.UpdateDotDee.find_snippets()`.
+        """
+        if self.direct_access:
+            return await offload(super(AsyncUpdateDotDee, self).find_snippets)
+        listing = await self.capture('find', self.directory, '-mindepth', '1', '-maxdepth', '1', '-print0')
+        entries = natsort(os.path.basename(fn) for fn in listing.decode().split('\0') if fn)
+        filenames = [os.path.join(self.directory, e) for e in entries if not e.startswith('.')]
+        executable = await gather_limited(self.concurrency, *(self.test('test', '-x', fn) for fn in filenames))
+        return list(zip(filenames, executable))
+
+    async def read_file(self, filename):
+        """
+        Read a text file and provide feedback to the user.
+
+        :param filename: The pathname of the file to read (a string).
+        :returns: The same value as :func:`.UpdateDotDee.read_file()`.
+        """
+        if self.direct_access:
+            return await offload(super(AsyncUpdateDotDee, self).read_file, filename)
+        logger.info("Reading file: %s", format_path(filename))
+        contents = await self.capture('cat', filename)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Read %s from %s.", pluralize(count_lines(contents), 'line'), format_path(filename))
+        return trim_trailing_whitespace(contents)
+
+    async def execute_file(self, filename):
+        """
+        Execute a file and provide feedback to the user.
+
+        :param filename: The pathname of the file to execute (a string).
+        :returns: The same value as :func:`.UpdateDotDee.execute_file()`.
+        """
+        logger.info("Executing file: %s", format_path(filename))
+        contents = await self.capture(filename)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Execution of %s yielded %s of output.",
+                         format_path(filename),
+                         pluralize(count_lines(contents), 'line'))
+        return trim_trailing_whitespace(contents)
+
+    async def write_file(self, filename, contents):
+        """
+        Write a text file and provide feedback to the user.
+
+        :param filename: The pathname of the file to write (a string).
+        :param contents: The new contents of the file (a string).
+        :returns: The SHA1 digest of the written contents (a string).
+        """
+        trimmed = trim_trailing_whitespace(contents)
+        if self.direct_access:
+            await offload(super(AsyncUpdateDotDee, self).write_file, filename, contents)
+        else:
+            logger.info("Writing file: %s", format_path(filename))
+            await self.capture('cat > %s' % quote(filename), input=b"".join((trimmed, b"\n")), shell=True)
+        checksum = hashlib.sha1(trimmed)
+        checksum.update(b"\n")
+        return checksum.hexdigest()
+
+    async def capture(self, *command, **options):
+        """
+        Execute an external command in :attr:`context` and capture its output.
+
+        :param command: The positional arguments are passed on to
+                        :func:`~executor.contexts.AbstractContext.prepare()`.
+        :param options: The keyword argument `input` gives the data to pass
+                        to the command on its standard input stream (a byte
+                        string), other keyword arguments are passed on to
+                        :func:`~executor.contexts.AbstractContext.prepare()`.
+        :returns: The standard output of the command (a byte string).
+        :raises: :exc:`~executor.ExternalCommandFailed` when the command
+                 exits with a nonzero status.
+        """
+        returncode, output = await self.start(*command, **options)
+        if returncode != 0:
+            cmd = self.context.prepare(*command, **options)
+            raise ExternalCommandFailed(cmd, error_message=format(
+                "External command failed with exit code %i! (command: %s)",
+                returncode, quote(cmd.command_line),
+            ))
+        return output
+
+    async def start(self, *command, **options):
+        """
+        Execute an external command in :attr:`context` without blocking the event loop.
+
+        :param command: The positional arguments are passed on to
+                        :func:`~executor.contexts.AbstractContext.prepare()`.
+        :param options: Refer to :func:`capture()`.
+        :returns: A tuple with two values: The exit code of the command (an
+                  integer) and its standard output (a byte string).
+        """
+        data = options.pop('input', None)
+        cmd = self.context.prepare(*command, **options)
+        process = await asyncio.create_subprocess_exec(
+            *cmd.command_line,
+            stdin=subprocess.DEVNULL if data is None else subprocess.PIPE,
+            stdout=subprocess.PIPE
+        )
+        output, _ = await process.communicate(data)
+        return process.returncode, output
+
+    async def test(self, *command, **options):
+        """
+        Execute an external command in :attr:`context` and get its status.
+
+        :param command: The positional arguments are passed on to
+                        :func:`~executor.contexts.AbstractContext.prepare()`.
+        :param options: Refer to :func:`capture()`.
+        :returns: :data:`True` if the command succeeded, :data:`False` otherwise.
+
+        When :attr:`direct_access` is :data:`True` and the command is one of
+        the ``test -d``, ``test -f`` or ``test -x`` commands that are used by
+        :func:`update_file()`, the check is performed locally instead.
+        """
+        if self.direct_access and len(command) == 3 and command[0] == 'test':
+            check = dict(zip(('-d', '-f', '-x'), (os.path.isdir, os.path.isfile, is_executable)))
+            if command[1] in check:
+                return check[command[1]](command[2])
+        returncode, output = await self.start(*command, **options)
+        return returncode == 0
+
+
+class AsyncConfigLoader(ConfigLoader):
+
+    """
+    Asynchronous variant of :class:`~update_dotdee.ConfigLoader`.
+
+    Use the :func:`load()` coroutine to search for and read the available
+    configuration files without blocking the event loop. Afterwards the
+    :attr:`parser`, :attr:`section_names` and :func:`get_options()`
+    members can be used without any further I/O.
+    """
+
+    @mutable_property
+    def concurrency(self):
+        """The maximum number of files read concurrently (an integer, defaults to :data:`DEFAULT_CONCURRENCY`)."""
+        return DEFAULT_CONCURRENCY
+
+    async def load(self):
+        """
+        Load the available configuration files.
+
+        :returns: A :class:`configparser.RawConfigParser` object (which is
+                  also used as the value of :attr:`parser`).
+
+        The configuration files are read concurrently but they are parsed in
+        the order given by :attr:`available_files` so that overrides work the
+        same as in :class:`~update_dotdee.ConfigLoader`.
+        """
+        filenames = await offload(getattr, self, 'available_files')
+        texts = await gather_limited(self.concurrency, *(offload(read_text, fn) for fn in filenames))
+        parser = configparser.RawConfigParser()
+        for filename, text in zip(filenames, texts):
+            friendly_name = format_path(filename)
+            logger.debug("Loading configuration file: %s", friendly_name)
+            if text is None:
+                self.report_issue("Failed to load configuration file! (%s)", friendly_name)
+            else:
+                parser.read_string(text, source=filename)
+        logger.debug("Loaded %s from %s.",
+                     pluralize(len(parser.sections()), "section"),
+                     pluralize(len(filenames), "configuration file"))
+        set_property(self, 'parser', parser)
+        return parser
+
+
+async def gather_limited(concurrency, *coroutines):
+    """
+    Run coroutines concurrently with an upper bound on concurrency.
+
+    :param concurrency: The maximum number of coroutines that are
+                        allowed to run at the same time (an integer).
+    :param coroutines: The coroutines to run.
+    :returns: A list with the results of the coroutines (in the given order).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_limited(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run_limited(c) for c in coroutines))
+
+
+def is_executable(pathname):
+    """Check whether the given pathname is executable (the equivalent of ``test -x``)."""
+    return os.access(pathname, os.X_OK)
+
+
+async def offload(function, *args):
+    """
+    Call a blocking function in the default executor of the event loop.
+
+    :param function: The function to call.
+    :param args: The positional arguments to the function.
+    :returns: The return value of the function.
+    """
+    return await asyncio.get_event_loop().run_in_executor(None, function, *args)
+
+
+def read_text(filename):
+    """
+    Read a configuration file (for :func:`AsyncConfigLoader.load()`).
+
+    :param filename: The pathname of the file (a string).
+    :returns: The contents of the file (a string) or :data:`None` when the
+              file can't be read.
+    """
+    try:
+        with open(filename) as handle:
+            return handle.read()
+    except (IOError, OSError):
+        return None
@@ -0,0 +1,491 @@
+# Generic modular configuration file manager.
+#
+# Author: Peter Odding <peter@peterodding.com>
+# Last Change: October 18, 2026
+# URL: https://pypi.python.org/pypi/update-dotdee
+
+"""
+Usage: python -m update_dotdee.benchmarks [OPTIONS]
+
+Measure the performance of `update-dotdee' using synthetic workloads.
+
+Each workload generates a temporary directory tree (a '.d' directory with
+configuration snippets or a hierarchy of '*.ini' files) after which the
+relevant operation is timed a number of times. The best and median timings
+are reported and can be recorded in a JSON file so that performance
+regressions can be compared across versions.
+
+Supported options:
+
+  -w, --workload=PATTERN
+
+    Only run the workloads whose name matches the given shell pattern
+    (can be repeated).
+
+  -l, --list
+
+    List the names of the available workloads and exit.
+
+  -x, --extended
+
+    Also run the large workloads (10,000 snippets, multi-megabyte
+    snippets, etc). These can take several minutes to complete.
+
+  -n, --repeat=COUNT
+
+    Measure each workload COUNT times (defaults to 3).
+
+  -o, --output=FILE
+
+    Append the results to FILE (a JSON document that contains a
+    list of benchmark runs). The file is created when it doesn't
+    exist yet.
+
+  -c, --compare=FILE
+
+    Compare the results to the most recent run recorded in FILE.
+
+  -h, --help
+
+    Show this message and exit.
+"""
+
+# Standard library modules.
+import fnmatch
+import getopt
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+# External dependencies.
+from executor import ExternalCommand
+from executor.contexts import AbstractContext, LocalContext
+from humanfriendly import format_size
+from humanfriendly.terminal import output, usage, warning
+from humanfriendly.testing import TemporaryDirectory
+from humanfriendly.text import format
+from humanfriendly.tables import format_pretty_table
+from property_manager import PropertyManager, mutable_property, required_property
+
+# Modules included in our package.
+from update_dotdee import ConfigLoader, UpdateDotDee, __version__
+
+DEFAULT_REPEAT = 3
+"""The default number of times that each workload is measured (an integer)."""
+
+SNIPPET_LINE = "option-{number} = value-{number} # synthetic configuration snippet\n"
+"""The template used to generate the contents of synthetic configuration snippets (a string)."""
+
+
+def main():
+    """Command line interface for the `update-dotdee` benchmarks."""
+    patterns = []
+    extended = False
+    list_workloads = False
+    repeat = DEFAULT_REPEAT
+    output_file = None
+    compare_file = None
+    try:
+        options, arguments = getopt.getopt(sys.argv[1:], 'w:lxn:o:c:h', [
+            'workload=', 'list', 'extended', 'repeat=',
+            'output=', 'compare=', 'help',
+        ])
+        for option, value in options:
+            if option in ('-w', '--workload'):
+                patterns.append(value)
+            elif option in ('-l', '--list'):
+                list_workloads = True
+            elif option in ('-x', '--extended'):
+                extended = True
+            elif option in ('-n', '--repeat'):
+                repeat = int(value)
+                if repeat < 1:
+                    raise Exception("The repeat count should be a positive integer!")
+            elif option in ('-o', '--output'):
+                output_file = value
+            elif option in ('-c', '--compare'):
+                compare_file = value
+            elif option in ('-h', '--help'):
+                usage(__doc__)
+                sys.exit(0)
+            else:
+                # Programming error...
+                assert False, "Unhandled option!"
+        if arguments:
+            raise Exception("This program doesn't accept positional arguments!")
+    except Exception as e:
+        warning("Error: %s", e)
+        sys.exit(1)
+    workloads = [w for w in get_workloads(extended)
+                 if any(fnmatch.fnmatch(w.name, p) for p in patterns or ['*'])]
+    if list_workloads:
+        for workload in workloads:
+            output("%s: %s", workload.name, workload.description)
+        return
+    if not workloads:
+        warning("Error: No workloads matched!")
+        sys.exit(1)
+    run = dict(
+        version=__version__,
+        python=platform.python_version(),
+        implementation=platform.python_implementation(),
+        timestamp=int(time.time()),
+        results={},
+    )
+    for workload in workloads:
+        output("Running workload %s (%s) ..", workload.name, workload.description)
+        run['results'][workload.name] = workload.run(repeat)
+    previous = load_results(compare_file) if compare_file else []
+    output(format_results(run, previous[-1] if previous else None))
+    if output_file:
+        runs = load_results(output_file)
+        runs.append(run)
+        with open(output_file, 'w') as handle:
+            json.dump(runs, handle, indent=2, sort_keys=True)
+
+
+def get_workloads(extended=False):
+    """
+    Get the synthetic workloads that are measured by the benchmark suite.
+
+    :param extended: :data:`True` to include the large workloads,
+                     :data:`False` to only include the small ones.
+    :returns: A list of :class:`Workload` objects.
+    """
+    workloads = [
+        SnippetWorkload(name='snippets-10', count=10),
+        SnippetWorkload(name='snippets-100', count=100),
+        SnippetWorkload(name='snippets-1000', count=1000),
+        SnippetWorkload(name='size-64b', count=10, size=64),
+        SnippetWorkload(name='size-64kb', count=10, size=1024 * 64),
+        SnippetWorkload(name='executables-10pct', count=100, executable_ratio=0.1),
+        SnippetWorkload(name='latency-5ms', count=20, latency=0.005),
+        ConfigWorkload(name='ini-10', count=10),
+        ConfigWorkload(name='ini-100', count=100),
+        ConfigWorkload(name='ini-refresh-100', count=100, refresh=True),
+        ConstructionWorkload(name='construct-1000', count=1000),
+        StartupWorkload(name='cli-startup'),
+    ]
+    if extended:
+        workloads.extend([
+            SnippetWorkload(name='snippets-10000', count=10000),
+            SnippetWorkload(name='size-4mb', count=10, size=1024 * 1024 * 4),
+            SnippetWorkload(name='executables-50pct', count=1000, executable_ratio=0.5),
+            SnippetWorkload(name='latency-50ms', count=20, latency=0.05),
+            ConfigWorkload(name='ini-1000', count=1000),
+            ConfigWorkload(name='ini-refresh-1000', count=1000, refresh=True),
+        ])
+    return workloads
+
+
+def format_results(run, previous=None):
+    """
+    Render benchmark results as a table.
+
+    :param run: A dictionary with benchmark results.
+    :param previous: A dictionary with the results of an earlier benchmark
+                     run to compare against (or :data:`None`).
+    :returns: The rendered table (a string).
+    """
+    column_names = ["Workload", "Best", "Median"]
+    if previous:
+        column_names.extend(["Previous (%s)" % previous['version'], "Change"])
+    rows = []
+    for name, timings in sorted(run['results'].items()):
+        row = [name, format_milliseconds(timings['best']), format_milliseconds(timings['median'])]
+        if previous:
+            baseline = previous['results'].get(name)
+            if baseline:
+                change = (timings['best'] - baseline['best']) / baseline['best'] * 100
+                row.extend([format_milliseconds(baseline['best']), "%+.1f%%" % change])
+            else:
+                row.extend(["-", "-"])
+        rows.append(row)
+    return format_pretty_table(rows, column_names)
+
+
+def format_milliseconds(seconds):
+    """
+    Format a duration with millisecond precision.
+
+    :param seconds: The duration in seconds (a number).
+    :returns: The formatted duration (a string).
+    """
+    return "%.2f ms" % (seconds * 1000)
+
+
+def generate_payload(size):
+    """
+    Generate synthetic configuration text.
+
+    :param size: The size of the text to generate (an integer number of bytes).
+    :returns: A string of (roughly) the given size.
+    """
+    lines = []
+    total = 0
+    number = 1
+    while total < size:
+        line = format(SNIPPET_LINE, number=number)
+        lines.append(line)
+        total += len(line)
+        number += 1
+    return "".join(lines)[:size]
+
+
+def load_results(filename):
+    """
+    Load benchmark results recorded by an earlier run.
+
+    :param filename: The pathname of a JSON file (a string).
+    :returns: A list of dictionaries (one for each recorded run).
+    """
+    if os.path.isfile(filename):
+        with open(filename) as handle:
+            return json.load(handle)
+    return []
+
+
+def measure(function, repeat):
+    """
+    Measure the duration of a function call.
+
+    :param function: The function to call (a callable).
+    :param repeat: The number of times to call the function (an integer).
+    :returns: A dictionary with the keys ``best`` and ``median`` (the
+              timings in seconds, as floating point numbers).
+    """
+    timings = []
+    for i in range(repeat):
+        started = timeit.default_timer()
+        function()
+        timings.append(timeit.default_timer() - started)
+    timings.sort()
+    return dict(best=timings[0], median=timings[len(timings) // 2])
+
+
+class LatencyContext(AbstractContext):
+
+    """
+    Local execution context that simulates the latency of a remote system.
+
+    Every command created by :class:`LatencyContext` is delayed by
+    :attr:`latency` seconds before it starts, which simulates the
+    connection overhead of running the command on a remote system over
+    SSH. Because this isn't a :class:`~executor.contexts.LocalContext`
+    the code in :mod:`update_dotdee` treats it as a remote system.
+    """
+
+    @property
+    def command_type(self):
+        """The type of command objects created by this context (:class:`~executor.ExternalCommand`)."""
+        return ExternalCommand
+
+    @mutable_property
+    def latency(self):
+        """The number of seconds to delay each command (a number, defaults to zero)."""
+        return 0
+
+    def prepare_command(self, command, options):
+        """Inject the simulated latency before preparing a command."""
+        time.sleep(self.latency)
+        return super(LatencyContext, self).prepare_command(command, options)
+
+    def __str__(self):
+        """Render a human friendly string representation of the context."""
+        return "simulated remote system (%s latency)" % format_milliseconds(self.latency)
+
+
+class Workload(PropertyManager):
+
+    """
+    Base class for synthetic workloads.
+
+    Subclasses define a ``prepare(directory)`` method that generates the
+    files needed by the workload in the given temporary directory and
+    returns a callable that performs the operation to be measured.
+    """
+
+    @required_property
+    def name(self):
+        """The name of the workload (a string)."""
+
+    @property
+    def description(self):
+        """A human friendly description of the workload (a string)."""
+        return self.name
+
+    def run(self, repeat):
+        """
+        Measure the workload in a temporary directory.
+
+        :param repeat: The number of times to measure the workload (an integer).
+        :returns: The result of :func:`measure()`.
+        """
+        with TemporaryDirectory() as directory:
+            return measure(self.prepare(directory), repeat)
+
+
+class SnippetWorkload(Workload):
+
+    """Measure :func:`.UpdateDotDee.update_file()` on a generated ``.d`` directory."""
+
+    @required_property
+    def count(self):
+        """The number of configuration snippets to generate (an integer)."""
+
+    @property
+    def description(self):
+        """A human friendly description of the workload (a string)."""
+        text = "%i snippets of %s" % (self.count, format_size(self.size))
+        if self.executable_ratio:
+            text += ", %i%% executable" % (self.executable_ratio * 100)
+        if self.latency:
+            text += ", %s latency" % format_milliseconds(self.latency)
+        return text
+
+    @mutable_property
+    def executable_ratio(self):
+        """The fraction of snippets that are executable (a number between zero and one)."""
+        return 0
+
+    @mutable_property
+    def latency(self):
+        """The simulated per-operation latency in seconds (refer to :class:`LatencyContext`)."""
+        return 0
+
+    @mutable_property
+    def size(self):
+        """The size of each configuration snippet in bytes (an integer, defaults to 128)."""
+        return 128
+
+    def prepare(self, directory):
+        """Generate a ``.d`` directory with configuration snippets."""
+        filename = os.path.join(directory, 'generated.conf')
+        snippets_directory = filename + '.d'
+        os.mkdir(snippets_directory)
+        payload = generate_payload(self.size)
+        executable_interval = int(1 / self.executable_ratio) if self.executable_ratio else 0
+        for number in range(1, self.count + 1):
+            pathname = os.path.join(snippets_directory, '%i.conf' % number)
+            executable = executable_interval and number % executable_interval == 0
+            with open(pathname, 'w') as handle:
+                if executable:
+                    handle.write("#!/bin/sh\ncat << 'EOF'\n%sEOF\n" % payload)
+                else:
+                    handle.write(payload)
+            if executable:
+                os.chmod(pathname, 0o755)
+        context = LatencyContext(latency=self.latency) if self.latency else LocalContext()
+        program = UpdateDotDee(filename=filename, context=context, force=True)
+        return program.update_file
+
+
+class ConfigWorkload(Workload):
+
+    """Measure :attr:`.ConfigLoader.parser` on a generated ``*.ini`` hierarchy."""
+
+    @required_property
+    def count(self):
+        """The number of modular configuration files to generate (an integer)."""
+
+    @property
+    def description(self):
+        """A human friendly description of the workload (a string)."""
+        text = "%i modular *.ini files" % self.count
+        if self.refresh:
+            text += ", refresh after changing one"
+        return text
+
+    @mutable_property
+    def refresh(self):
+        """Whether to measure refreshing the configuration after changing one file (a boolean)."""
+        return False
+
+    def prepare(self, directory):
+        """Generate a hierarchy of ``*.ini`` configuration files."""
+        base_directories = [os.path.join(directory, d) for d in ('etc', 'home', 'config')]
+        for base_directory in base_directories:
+            modular_directory = os.path.join(base_directory, 'benchmark.d')
+            os.makedirs(modular_directory)
+            with open(os.path.join(base_directory, 'benchmark.ini'), 'w') as handle:
+                handle.write("[main]\nbase-directory = %s\n" % base_directory)
+        for number in range(1, self.count + 1):
+            base_directory = base_directories[number % len(base_directories)]
+            pathname = os.path.join(base_directory, 'benchmark.d', '%i.ini' % number)
+            with open(pathname, 'w') as handle:
+                handle.write("[section-%i]\n" % number)
+                handle.write(generate_payload(256))
+                handle.write("\n[main]\noverride-%i = %i\n" % (number % 10, number))
+
+        def load_configuration():
+            loader = ConfigLoader(program_name='benchmark', base_directories=base_directories)
+            return loader.parser
+
+        if self.refresh:
+            loader = ConfigLoader(program_name='benchmark', base_directories=base_directories)
+            loader.parser
+
+            def refresh_configuration():
+                with open(pathname, 'a') as handle:
+                    handle.write("\n")
+                return loader.refresh()
+
+            return refresh_configuration
+        return load_configuration
+
+
+class ConstructionWorkload(Workload):
+
+    """Measure the construction of :class:`.ConfigLoader` and :class:`.UpdateDotDee` objects."""
+
+    @required_property
+    def count(self):
+        """The number of objects of each type to construct (an integer)."""
+
+    @property
+    def description(self):
+        """A human friendly description of the workload (a string)."""
+        return "construct %i ConfigLoader and UpdateDotDee objects" % self.count
+
+    def prepare(self, directory):
+        """Prepare to construct objects (no files are needed)."""
+        filename = os.path.join(directory, 'generated.conf')
+
+        def construct_objects():
+            for number in range(self.count):
+                ConfigLoader(program_name='benchmark-%i' % number, filename_extension='.conf')
+                UpdateDotDee(filename=filename, force=True)
+
+        return construct_objects
+
+
+class StartupWorkload(Workload):
+
+    """Measure the startup time of the ``update-dotdee`` command line interface."""
+
+    @property
+    def description(self):
+        """A human friendly description of the workload (a string)."""
+        return "update-dotdee --help in a new interpreter"
+
+    def prepare(self, directory):
+        """Prepare to start a Python interpreter that runs ``update-dotdee --help``."""
+        command = [
+            sys.executable, '-c',
+            'import sys; from update_dotdee.cli import main; main()',
+            '--help',
+        ]
+
+        def start_program():
+            with open(os.devnull, 'wb') as handle:
+                subprocess.check_call(command, stdout=handle, stderr=handle)
+
+        return start_program
+
+
+if __name__ == '__main__':
+    main()
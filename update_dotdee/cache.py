@@ -0,0 +1,167 @@
+# Generic modular configuration file manager.
+#
+# Author: Peter Odding <peter@peterodding.com>
+# Last Change: October 18, 2026
+# URL: https://pypi.python.org/pypi/update-dotdee
+
+"""
+Local cache for the contents of remote configuration snippets.
+
+When :attr:`.UpdateDotDee.cache` is set to a :class:`SnippetCache` object the
+contents of configuration snippets that are read through an execution context
+(for example from a remote system over SSH) are stored in a local directory.
+The cache keys are based on the host, pathname, size, modification time and
+inode number of the remote files, so on subsequent runs only the snippets
+whose metadata changed are transferred again.
+"""
+
+# Standard library modules.
+import hashlib
+import logging
+import os
+import stat
+
+# External dependencies.
+from humanfriendly import format_path, format_size, parse_path
+from humanfriendly.text import pluralize
+from property_manager import PropertyManager, mutable_property
+
+DEFAULT_MAX_SIZE = 1024 * 1024 * 100
+"""The default maximum size of the cache directory in bytes (an integer, 100 MiB)."""
+
+# Initialize a logger for this module.
+logger = logging.getLogger(__name__)
+
+
+class SnippetCache(PropertyManager):
+
+    """
+    Size bounded cache of configuration snippet contents.
+
+    Each cache entry is a file in :attr:`directory` whose name is the cache
+    key. Cache hits update the modification time of the entry, which enables
+    :func:`evict()` to remove the least recently used entries first.
+    """
+
+    @mutable_property
+    def directory(self):
+        """
+        The pathname of the directory that holds the cache entries (a string).
+
+        Defaults to ``update-dotdee`` in ``$XDG_CACHE_HOME`` (which
+        defaults to ``~/.cache``). The directory is created on demand.
+        """
+        return os.path.join(parse_path(os.environ.get('XDG_CACHE_HOME', '~/.cache')), 'update-dotdee')
+
+    @mutable_property
+    def max_size(self):
+        """The maximum size of the cache directory in bytes (an integer, defaults to :data:`DEFAULT_MAX_SIZE`)."""
+        return DEFAULT_MAX_SIZE
+
+    def get_key(self, host, pathname, size, mtime, inode):
+        """
+        Generate a cache key.
+
+        :param host: Identifies the system that hosts the file (a string).
+        :param pathname: The pathname of the file (a string).
+        :param size: The size of the file (a string or integer).
+        :param mtime: The modification time of the file (a string or number).
+        :param inode: The inode number of the file (a string or integer).
+        :returns: The cache key (a string).
+        """
+        fields = [host, pathname, size, mtime, inode]
+        return hashlib.sha1('\0'.join(map(str, fields)).encode('UTF-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Get cached contents.
+
+        :param key: A cache key generated by :func:`get_key()`.
+        :returns: The cached contents (a byte string) or :data:`None`.
+        """
+        pathname = os.path.join(self.directory, key)
+        try:
+            with open(pathname, 'rb') as handle:
+                contents = handle.read()
+            # Mark the entry as recently used.
+            os.utime(pathname, None)
+            return contents
+        except (IOError, OSError):
+            return None
+
+    def put(self, key, contents):
+        """
+        Add contents to the cache.
+
+        :param key: A cache key generated by :func:`get_key()`.
+        :param contents: The contents to cache (a byte string).
+
+        The entry is written to a temporary file that is then renamed into
+        place, so concurrent readers never see partially written entries.
+        Because snippets may have been read using ``sudo`` the directory and
+        the entries are only accessible to the current user (refer to
+        :func:`create_directory()`).
+        """
+        self.create_directory()
+        pathname = os.path.join(self.directory, key)
+        temporary_file = '%s.tmp-%i' % (pathname, os.getpid())
+        fd = os.open(temporary_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(contents)
+        os.rename(temporary_file, pathname)
+
+    def create_directory(self):
+        """
+        Create :attr:`directory` (if it doesn't exist yet) and make it private.
+
+        The directory is created with mode 0700. When the directory already
+        exists and is accessible to other users its mode is changed to 0700.
+        This is safe to call from concurrent threads (refer to
+        :attr:`.UpdateDotDee.read_concurrency`).
+        """
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory, 0o700)
+            except OSError:
+                # Another thread or process may have created the directory.
+                if not os.path.isdir(self.directory):
+                    raise
+        mode = stat.S_IMODE(os.stat(self.directory).st_mode)
+        if mode & (stat.S_IRWXG | stat.S_IRWXO):
+            logger.debug("Restricting access to %s ..", format_path(self.directory))
+            os.chmod(self.directory, 0o700)
+
+    def evict(self):
+        """
+        Remove the least recently used entries that don't fit in :attr:`max_size`.
+
+        :returns: The number of entries that were removed (an integer).
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.directory):
+            pathname = os.path.join(self.directory, name)
+            try:
+                metadata = os.stat(pathname)
+            except OSError:
+                continue
+            entries.append((metadata.st_mtime, metadata.st_size, pathname))
+            total_size += metadata.st_size
+        removed = 0
+        for mtime, size, pathname in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.unlink(pathname)
+                removed += 1
+            except OSError:
+                pass
+            total_size -= size
+        if removed:
+            logger.debug("Evicted %s from %s (%s remaining).",
+                         pluralize(removed, "cache entry", "cache entries"),
+                         format_path(self.directory),
+                         format_size(total_size))
+        return removed
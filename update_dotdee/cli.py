@@ -1,7 +1,7 @@
 # Generic modular configuration file manager.
 #
 # Author: Peter Odding <peter@peterodding.com>
-# Last Change: May 17, 2020
+# Last Change: October 18, 2026
 # URL: https://pypi.python.org/pypi/update-dotdee
 
 """
@@ -16,21 +16,81 @@ existing contents are preserved.
 
 Supported options:
 
+  -C, --check
+
+    Check whether FILENAME is up to date without changing anything. The
+    exit code is 0 when FILENAME is up to date, 2 when FILENAME needs to
+    be updated (because the '.d' directory changed or FILENAME hasn't been
+    generated yet) and 3 when FILENAME contains local modifications.
+
   -f, --force
 
     Update FILENAME even if it contains local modifications,
     instead of aborting with an error message.
 
+  -g, --generations=COUNT
+
+    Keep copies of the last COUNT generated versions of FILENAME in a
+    hidden subdirectory of the '.d' directory, so that --rollback can
+    restore a previous version.
+
+  -R, --rollback
+
+    Restore the version of FILENAME that was generated before the current
+    version (requires --generations to have been used before) instead of
+    generating FILENAME. Can be repeated to move further back in history.
+
+  -j, --jobs=COUNT
+
+    Read up to COUNT snippets concurrently when operating on the local
+    system. This helps when the '.d' directory is on a filesystem where
+    every read waits for a network round trip (like NFS).
+
   -u, --use-sudo
 
     Enable the use of `sudo' to update configuration files that are not
     readable and/or writable for the current user (or the user logged
     in to a remote system over SSH).
 
+  -H, --use-helper
+
+    Perform all file operations through a single helper process instead
+    of running a separate command (with `sudo' and/or `ssh') for each
+    operation. Combined with --use-sudo this means only one privilege
+    escalation is needed. Requires a Python interpreter on the system
+    that hosts FILENAME.
+
   -r, --remote-host=SSH_ALIAS
 
     Operate on a remote system instead of the local system. The
-    SSH_ALIAS argument gives the SSH alias of the remote host.
+    SSH_ALIAS argument gives the SSH alias of the remote host. A single
+    SSH connection is shared by all remote commands (using connection
+    multiplexing).
+
+  -c, --cache=DIRECTORY
+
+    Cache the contents of configuration snippets that are read from a
+    remote system in the given local DIRECTORY, so that on subsequent runs
+    only the snippets that changed (according to their size, modification
+    time and inode number) are transferred.
+
+  -z, --compress
+
+    Transfer files of at least 4 KiB that are read from or written to a
+    remote system in compressed form, which can greatly reduce transfer
+    times for repetitive configuration files on slow network links.
+    Requires the `gzip' program on the remote system.
+
+  -p, --profile=FILE
+
+    Profile the run (including the imports of Python modules) using
+    cProfile and save the statistics in FILE. The environment variable
+    $UPDATE_DOTDEE_PROFILE can be used to the same effect.
+
+  -P, --profile-top=COUNT
+
+    Profile the run and print the COUNT functions with the highest
+    cumulative time afterwards.
 
   -v, --verbose
 
@@ -46,41 +106,110 @@ Supported options:
 """
 
 # Standard library modules.
+import contextlib
 import getopt
 import logging
+import os
+import pstats
+import subprocess
 import sys
+import tempfile
 
 # External dependencies.
 import coloredlogs
-from executor.contexts import create_context
+from executor.contexts import RemoteContext, create_context
+from humanfriendly import format_path, parse_path
 from humanfriendly.terminal import usage, warning
+from humanfriendly.text import dedent
 
 # Modules included in our package.
-from update_dotdee import UpdateDotDee
+from update_dotdee import (
+    DEFAULT_COMPRESSION_THRESHOLD,
+    STATUS_MODIFIED,
+    STATUS_STALE,
+    STATUS_UP_TO_DATE,
+    UpdateDotDee,
+)
+from update_dotdee.cache import SnippetCache
+from update_dotdee.helper import HelperContext
+from update_dotdee.multiplexing import MultiplexedConnection
+
+EXIT_CODES = {
+    STATUS_UP_TO_DATE: 0,
+    STATUS_STALE: 2,
+    STATUS_MODIFIED: 3,
+}
+"""Mapping of :func:`.UpdateDotDee.check_file()` results to the exit codes of ``update-dotdee --check``."""
+
+PROFILE_SCRIPT = dedent('''
+    import cProfile, sys
+    filename = sys.argv.pop(1)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        from update_dotdee.cli import main
+        main(profiling=False)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(filename)
+''')
+"""The Python code that runs :func:`main()` under :mod:`cProfile` (a string)."""
+
+PROFILE_VARIABLE = 'UPDATE_DOTDEE_PROFILE'
+"""The name of the environment variable that enables profiling (a string)."""
 
 # Initialize a logger for this module.
 logger = logging.getLogger(__name__)
 
 
-def main():
-    """Command line interface for the ``update-dotdee`` program."""
+def main(profiling=True):
+    """
+    Command line interface for the ``update-dotdee`` program.
+
+    :param profiling: :data:`False` to ignore the profiling options (used in
+                      the child process started by :func:`run_profiled()`).
+    """
     # Initialize logging to the terminal and system log.
     coloredlogs.install(syslog=True)
     # Parse the command line arguments.
     context_opts = {}
     program_opts = {}
+    use_helper = False
+    check = False
+    rollback = False
+    profile_file = os.environ.get(PROFILE_VARIABLE)
+    profile_top = 0
     try:
-        options, arguments = getopt.getopt(sys.argv[1:], 'fur:vqh', [
-            'force', 'use-sudo', 'remote-host=',
+        options, arguments = getopt.getopt(sys.argv[1:], 'Cfg:Rj:uHr:c:zp:P:vqh', [
+            'check', 'force', 'generations=', 'rollback', 'jobs=', 'use-sudo', 'use-helper',
+            'remote-host=', 'cache=', 'compress', 'profile=', 'profile-top=',
             'verbose', 'quiet', 'help',
         ])
         for option, value in options:
-            if option in ('-f', '--force'):
+            if option in ('-C', '--check'):
+                check = True
+            elif option in ('-f', '--force'):
                 program_opts['force'] = True
+            elif option in ('-g', '--generations'):
+                program_opts['generations'] = int(value)
+            elif option in ('-R', '--rollback'):
+                rollback = True
+            elif option in ('-j', '--jobs'):
+                program_opts['read_concurrency'] = int(value)
             elif option in ('-u', '--use-sudo'):
                 context_opts['sudo'] = True
+            elif option in ('-H', '--use-helper'):
+                use_helper = True
             elif option in ('-r', '--remote-host'):
                 context_opts['ssh_alias'] = value
+            elif option in ('-c', '--cache'):
+                program_opts['cache'] = SnippetCache(directory=parse_path(value))
+            elif option in ('-z', '--compress'):
+                program_opts['compression_threshold'] = DEFAULT_COMPRESSION_THRESHOLD
+            elif option in ('-p', '--profile'):
+                profile_file = parse_path(value)
+            elif option in ('-P', '--profile-top'):
+                profile_top = int(value)
             elif option in ('-v', '--verbose'):
                 coloredlogs.increase_verbosity()
             elif option in ('-q', '--quiet'):
@@ -100,12 +229,90 @@ def main():
     except Exception as e:
         warning("Error: %s", e)
         sys.exit(1)
+    # Run the program in a profiled child process?
+    if profiling and (profile_file or profile_top):
+        sys.exit(run_profiled(profile_file, profile_top))
     # Run the program.
     try:
         # Initialize the execution context.
-        program_opts['context'] = create_context(**context_opts)
-        # Initialize the program and update the file.
-        UpdateDotDee(**program_opts).update_file()
+        context = create_context(**context_opts)
+        with connect(context):
+            # Route all operations through a single helper process?
+            if use_helper:
+                context = HelperContext(context=context)
+            with context:
+                # Initialize the program and check, roll back or update the file.
+                program = UpdateDotDee(context=context, **program_opts)
+                if check:
+                    status = program.check_file()
+                elif rollback:
+                    program.rollback()
+                else:
+                    program.update_file()
     except Exception:
         logger.exception("Encountered unexpected exception, aborting!")
         sys.exit(1)
+    if check:
+        sys.exit(EXIT_CODES[status])
+
+
+@contextlib.contextmanager
+def connect(context):
+    """
+    Share a single SSH connection between the commands of a remote context.
+
+    :param context: An execution context created by :mod:`executor.contexts`.
+    :returns: A context manager (see the :keyword:`with` statement).
+
+    For remote contexts a :class:`~update_dotdee.multiplexing.MultiplexedConnection`
+    is used. When the master connection can't be started a warning is logged
+    and each command falls back to connecting on its own.
+    """
+    if isinstance(context, RemoteContext):
+        connection = MultiplexedConnection(context=context)
+        try:
+            connection.open()
+        except Exception as e:
+            logger.warning("Failed to start SSH master connection, continuing without it! (%s)", e)
+        try:
+            yield
+        finally:
+            connection.close()
+    else:
+        yield
+
+
+def run_profiled(filename=None, top=0):
+    """
+    Run the command line interface in a child process under :mod:`cProfile`.
+
+    :param filename: The pathname of the file where the profile statistics
+                     are saved (a string or :data:`None`).
+    :param top: The number of hot spots to print after the run (an integer).
+    :returns: The exit code of the child process (an integer).
+
+    A new Python interpreter is started so that the imports of all modules
+    are included in the profile. The child process receives the command line
+    arguments of the current process (it ignores the profiling options) and
+    the environment without :data:`PROFILE_VARIABLE`, so that programs started
+    by executable snippets aren't profiled.
+    """
+    temporary_file = None
+    if not filename:
+        fd, temporary_file = tempfile.mkstemp(prefix='update-dotdee-', suffix='.prof')
+        os.close(fd)
+        filename = temporary_file
+    environment = dict(os.environ)
+    environment.pop(PROFILE_VARIABLE, None)
+    command = [sys.executable, '-c', PROFILE_SCRIPT, filename] + sys.argv[1:]
+    try:
+        returncode = subprocess.call(command, env=environment)
+        if not temporary_file:
+            logger.info("Saved profile statistics to %s.", format_path(filename))
+        if top > 0:
+            stats = pstats.Stats(filename, stream=sys.stdout)
+            stats.sort_stats('cumulative').print_stats(top)
+        return returncode
+    finally:
+        if temporary_file:
+            os.unlink(temporary_file)
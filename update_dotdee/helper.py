@@ -0,0 +1,296 @@
+# Generic modular configuration file manager.
+#
+# Author: Peter Odding <peter@peterodding.com>
+# Last Change: October 18, 2026
+# URL: https://pypi.python.org/pypi/update-dotdee
+
+"""
+Single privileged helper process for all file operations.
+
+When ``sudo`` is used every file check, read and write that
+:class:`~update_dotdee.UpdateDotDee` performs through its execution context
+runs as a separate ``sudo`` command (and for remote systems as a separate SSH
+command). The :class:`HelperContext` class avoids this overhead: It starts
+one helper process through the wrapped context (so that ``sudo`` and ``ssh``
+are applied exactly once) and sends all operations to that process over a
+pipe. The helper is a small Python program that is passed on the command line,
+so the only requirement on the target system is a Python interpreter.
+
+Here's an example:
+
+.. code-block:: python
+
+   from executor.contexts import RemoteContext
+   from update_dotdee import UpdateDotDee
+   from update_dotdee.helper import HelperContext
+
+   with HelperContext(context=RemoteContext(ssh_alias='server', sudo=True)) as context:
+       UpdateDotDee(context=context, filename='/etc/hosts').update_file()
+"""
+
+# Standard library modules.
+import json
+import logging
+import subprocess
+
+# External dependencies.
+from executor import DEFAULT_SHELL, ExternalCommandFailed, quote
+from executor.contexts import AbstractContext
+from humanfriendly.text import dedent, format
+from property_manager import mutable_property, required_property
+
+HELPER_SCRIPT = dedent(r'''
+    import json, os, subprocess, sys
+    stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+    stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+    checks = {
+        '-d': os.path.isdir,
+        '-e': os.path.exists,
+        '-f': os.path.isfile,
+        '-r': lambda p: os.access(p, os.R_OK),
+        '-w': lambda p: os.access(p, os.W_OK),
+        '-x': lambda p: os.access(p, os.X_OK),
+    }
+    def respond(result=None, data=b'', error=None):
+        header = json.dumps(dict(result=result, size=len(data), error=error))
+        stdout.write(header.encode('utf-8') + b'\n')
+        stdout.write(data)
+        stdout.flush()
+    while True:
+        line = stdin.readline()
+        if not line:
+            break
+        request = json.loads(line.decode('utf-8'))
+        data = stdin.read(request['size']) if request['size'] else b''
+        operation, args = request['operation'], request['args']
+        try:
+            if operation == 'test':
+                respond(bool(checks[args[0]](args[1])))
+            elif operation == 'list':
+                respond(os.listdir(args[0]))
+            elif operation == 'read':
+                with open(args[0], 'rb') as handle:
+                    respond(data=handle.read())
+            elif operation == 'write':
+                with open(args[0], 'wb') as handle:
+                    handle.write(data)
+                respond(True)
+            elif operation == 'execute':
+                process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+                output, _ = process.communicate(data)
+                respond(process.returncode, output)
+            elif operation == 'exit':
+                respond(True)
+                break
+            else:
+                respond(error='Unsupported operation! (%s)' % operation)
+        except Exception as e:
+            respond(error='%s: %s' % (type(e).__name__, e))
+''')
+"""The Python source code of the helper program (a string)."""
+
+LAUNCHER_SCRIPT = 'for p in python3 python; do command -v $p >/dev/null && exec $p -c "$1"; done; exit 127'
+"""A shell script that starts :data:`HELPER_SCRIPT` using the first available Python interpreter (a string)."""
+
+# Initialize a logger for this module.
+logger = logging.getLogger(__name__)
+
+
+class HelperContext(AbstractContext):
+
+    """
+    Execution context that routes all operations through one helper process.
+
+    The file operations used by :class:`~update_dotdee.UpdateDotDee`
+    (:func:`is_file()`, :func:`list_entries()`, :func:`read_file()`,
+    :func:`write_file()`, etc.) are served directly by the helper process,
+    while external commands started using :func:`execute()`,
+    :func:`capture()` and :func:`test()` are spawned by the helper process.
+
+    The helper process is started on first use and stopped by :func:`close()`
+    (which is called automatically when :class:`HelperContext` is used as a
+    context manager).
+    """
+
+    @required_property
+    def context(self):
+        """The execution context that starts the helper process, for example one with ``sudo`` enabled."""
+
+    @property
+    def command_type(self):
+        """The type of command objects created by :attr:`context`."""
+        return self.context.command_type
+
+    @mutable_property
+    def process(self):
+        """The :class:`subprocess.Popen` object of the helper or :data:`None` when it's not running."""
+
+    def get_options(self):
+        """Get the options of :attr:`context`."""
+        return self.context.get_options()
+
+    def start(self):
+        """Start the helper process (if it's not already running)."""
+        if self.process is None:
+            logger.debug("Starting helper process in %s ..", self.context)
+            cmd = self.context.prepare('sh', '-c', LAUNCHER_SCRIPT, 'sh', HELPER_SCRIPT, tty=False)
+            self.process = subprocess.Popen(cmd.command_line, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def close(self):
+        """Stop the helper process (if it's running)."""
+        if self.process is not None:
+            logger.debug("Stopping helper process in %s ..", self.context)
+            try:
+                self.request('exit')
+            except Exception:
+                pass
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+
+    def request(self, operation, *args, **options):
+        """
+        Send a request to the helper process and wait for the response.
+
+        :param operation: The name of the operation (a string).
+        :param args: The arguments of the operation (strings).
+        :param options: The keyword argument `data` can be used to send a byte
+                        string along with the request.
+        :returns: A tuple with two values: The result of the operation and
+                  the byte string that was sent along with the response.
+        :raises: :exc:`HelperError` when the helper reports an error or
+                 unexpectedly exits.
+        """
+        self.start()
+        data = options.get('data') or b''
+        header = json.dumps(dict(operation=operation, args=list(args), size=len(data)))
+        try:
+            self.process.stdin.write(header.encode('UTF-8') + b'\n')
+            self.process.stdin.write(data)
+            self.process.stdin.flush()
+            line = self.process.stdout.readline()
+        except (IOError, OSError) as e:
+            raise HelperError(format("Lost connection to helper process! (%s)", e))
+        if not line:
+            raise HelperError("Helper process exited unexpectedly!")
+        response = json.loads(line.decode('UTF-8'))
+        data = self.process.stdout.read(response['size']) if response['size'] else b''
+        if response['error']:
+            raise HelperError(format("Helper failed to %s %s! (%s)", operation, quote(args), response['error']))
+        return response['result'], data
+
+    def capture(self, *command, **options):
+        """Execute an external command through the helper process and capture its output."""
+        return self.execute(*command, **options).output
+
+    def execute(self, *command, **options):
+        """
+        Execute an external command through the helper process.
+
+        :param command: The command to execute (one or more strings). A single
+                        string is evaluated by :data:`~executor.DEFAULT_SHELL`.
+        :param options: The keyword arguments `input` and `check` are
+                        supported (other options are ignored because the
+                        command always runs in the helper process).
+        :returns: A :class:`HelperCommand` object.
+        :raises: :exc:`~executor.ExternalCommandFailed` when `check` is
+                 :data:`True` (the default) and the command fails.
+        """
+        command = list(command)
+        if len(command) == 1 and options.get('shell', True):
+            command = [DEFAULT_SHELL, '-c', command[0]]
+        data = options.get('input')
+        if data is not None and not isinstance(data, bytes):
+            data = data.encode('UTF-8')
+        returncode, output = self.request('execute', *command, data=data)
+        result = HelperCommand(command=command, returncode=returncode, stdout=output)
+        if returncode != 0 and options.get('check', True):
+            raise ExternalCommandFailed(self.context.prepare(*command), error_message=format(
+                "External command failed with exit code %i! (command: %s)",
+                returncode, quote(command),
+            ))
+        return result
+
+    def is_directory(self, pathname):
+        """Check whether the given pathname points to an existing directory."""
+        return self.request('test', '-d', pathname)[0]
+
+    def is_executable(self, pathname):
+        """Check whether the given pathname points to an executable file."""
+        return self.request('test', '-x', pathname)[0]
+
+    def is_file(self, pathname):
+        """Check whether the given pathname points to an existing file."""
+        return self.request('test', '-f', pathname)[0]
+
+    def is_readable(self, pathname):
+        """Check whether the given pathname exists and is readable."""
+        return self.request('test', '-r', pathname)[0]
+
+    def is_writable(self, pathname):
+        """Check whether the given pathname exists and is writable."""
+        return self.request('test', '-w', pathname)[0]
+
+    def exists(self, pathname):
+        """Check whether the given pathname exists."""
+        return self.request('test', '-e', pathname)[0]
+
+    def list_entries(self, directory):
+        """List the entries in a directory."""
+        return self.request('list', directory)[0]
+
+    def read_file(self, filename, **options):
+        """Read the contents of a file (a byte string)."""
+        return self.request('read', filename)[1]
+
+    def test(self, *command, **options):
+        """Execute an external command through the helper process and get its status."""
+        options.update(check=False)
+        return self.execute(*command, **options).succeeded
+
+    def write_file(self, filename, contents, **options):
+        """Change the contents of a file."""
+        if not isinstance(contents, bytes):
+            contents = contents.encode('UTF-8')
+        self.request('write', filename, data=contents)
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        """Stop the helper process when leaving a :keyword:`with` block."""
+        super(HelperContext, self).__exit__(exc_type, exc_value, traceback)
+        self.close()
+
+    def __str__(self):
+        """Render a human friendly string representation of the context."""
+        return str(self.context)
+
+
+class HelperCommand(object):
+
+    """The result of a command executed by :func:`HelperContext.execute()`."""
+
+    def __init__(self, command, returncode, stdout):
+        """
+        Initialize a :class:`HelperCommand` object.
+
+        :param command: The command line (a list of strings).
+        :param returncode: The exit code of the command (an integer).
+        :param stdout: The standard output of the command (a byte string).
+        """
+        self.command = command
+        self.returncode = returncode
+        self.stdout = stdout
+
+    @property
+    def output(self):
+        """The standard output of the command decoded and stripped (a string)."""
+        return self.stdout.decode('UTF-8').strip()
+
+    @property
+    def succeeded(self):
+        """:data:`True` if the command exited with status zero, :data:`False` otherwise."""
+        return self.returncode == 0
+
+
+class HelperError(Exception):
+
+    """Raised when the helper process reports an error or exits unexpectedly."""
@@ -0,0 +1,156 @@
+# Generic modular configuration file manager.
+#
+# Author: Peter Odding <peter@peterodding.com>
+# Last Change: October 18, 2026
+# URL: https://pypi.python.org/pypi/update-dotdee
+
+"""
+Reuse of a single SSH connection for all remote operations.
+
+Every operation that :class:`~update_dotdee.UpdateDotDee` performs on a
+:class:`~executor.contexts.RemoteContext` runs an external command over SSH.
+Without connection reuse each of these commands pays for a full SSH
+handshake. The :class:`MultiplexedConnection` class starts an SSH master
+connection with a private control socket and configures the context so that
+all commands are routed over that connection (only a channel needs to be
+opened per command). When the connection is closed the master connection is
+stopped and the control socket is removed.
+
+Here's an example:
+
+.. code-block:: python
+
+   from executor.contexts import RemoteContext
+   from update_dotdee import UpdateDotDee
+   from update_dotdee.multiplexing import MultiplexedConnection
+
+   context = RemoteContext(ssh_alias='server')
+   with MultiplexedConnection(context=context):
+       UpdateDotDee(context=context, filename='/etc/hosts').update_file()
+"""
+
+# Standard library modules.
+import logging
+import os
+import shutil
+import tempfile
+
+# External dependencies.
+from executor.ssh.client import SSH_PROGRAM_NAME
+from property_manager import PropertyManager, mutable_property, required_property
+
+# Initialize a logger for this module.
+logger = logging.getLogger(__name__)
+
+
+class MultiplexedConnection(PropertyManager):
+
+    """
+    SSH master connection that is shared by all commands of a remote context.
+
+    Use :class:`MultiplexedConnection` objects as context managers (see the
+    :keyword:`with` statement) or call :func:`open()` and :func:`close()`.
+    """
+
+    @required_property
+    def context(self):
+        """The :class:`~executor.contexts.RemoteContext` object whose commands should share a connection."""
+
+    @mutable_property(cached=True)
+    def control_directory(self):
+        """The pathname of the private directory that contains :attr:`control_path` (a string)."""
+        return tempfile.mkdtemp(prefix='update-dotdee-')
+
+    @property
+    def control_path(self):
+        """The pathname of the control socket of the SSH master connection (a string)."""
+        return os.path.join(self.control_directory, 'control')
+
+    @mutable_property
+    def idle_timeout(self):
+        """
+        The number of seconds that an unused master connection stays alive (an integer, defaults to 60).
+
+        When the process is killed before :func:`close()` is called the master
+        connection exits on its own once it has been idle for this long, so
+        interrupted runs don't leave SSH sessions behind.
+        """
+        return 60
+
+    @mutable_property
+    def is_open(self):
+        """:data:`True` while the master connection is running, :data:`False` otherwise."""
+        return False
+
+    @mutable_property
+    def saved_ssh_command(self):
+        """The original ``ssh_command`` option of :attr:`context` (a list of strings or :data:`None`)."""
+
+    def open(self):
+        """
+        Start the SSH master connection and route the commands of :attr:`context` over it.
+
+        :raises: :exc:`~executor.ExternalCommandFailed` when the SSH master
+                 connection can't be established.
+        """
+        if not self.is_open:
+            self.saved_ssh_command = self.context.options.get('ssh_command')
+            ssh_command = list(self.saved_ssh_command or [SSH_PROGRAM_NAME])
+            logger.debug("Starting SSH master connection to %s ..", self.context.ssh_alias)
+            try:
+                self.run_ssh_client(ssh_command + [
+                    '-o', 'ControlMaster=yes',
+                    '-o', 'ControlPath=%s' % self.control_path,
+                    '-o', 'ControlPersist=%i' % self.idle_timeout,
+                    '-f', '-N',
+                ])
+            except Exception:
+                self.remove_control_directory()
+                raise
+            self.context.options['ssh_command'] = ssh_command + [
+                '-o', 'ControlMaster=no',
+                '-o', 'ControlPath=%s' % self.control_path,
+            ]
+            self.is_open = True
+
+    def close(self):
+        """Stop the SSH master connection and restore the ``ssh_command`` option of :attr:`context`."""
+        if self.is_open:
+            logger.debug("Stopping SSH master connection to %s ..", self.context.ssh_alias)
+            self.run_ssh_client(list(self.saved_ssh_command or [SSH_PROGRAM_NAME]) + [
+                '-o', 'ControlPath=%s' % self.control_path,
+                '-O', 'exit',
+            ], check=False, silent=True)
+            if self.saved_ssh_command is None:
+                self.context.options.pop('ssh_command', None)
+            else:
+                self.context.options['ssh_command'] = self.saved_ssh_command
+            self.remove_control_directory()
+            self.is_open = False
+
+    def remove_control_directory(self):
+        """Remove :attr:`control_directory` (a new directory is created when it's needed again)."""
+        shutil.rmtree(self.control_directory, ignore_errors=True)
+        del self.control_directory
+
+    def run_ssh_client(self, ssh_command, **options):
+        """
+        Run the SSH client without a remote command.
+
+        :param ssh_command: The SSH client command (a list of strings).
+        :param options: Any keyword arguments are passed on to
+                        :func:`~executor.contexts.AbstractContext.execute()`.
+        """
+        # The master connection itself shouldn't use sudo (sudo applies to
+        # the remote commands) nor allocate a pseudo terminal.
+        options.update(ssh_command=ssh_command, sudo=False, uid=None, user=None, tty=False)
+        return self.context.execute(**options)
+
+    def __enter__(self):
+        """Open the connection when entering a :keyword:`with` block."""
+        self.open()
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        """Close the connection when leaving a :keyword:`with` block."""
+        self.close()
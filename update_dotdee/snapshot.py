@@ -0,0 +1,234 @@
+# Generic modular configuration file manager.
+#
+# Author: Peter Odding <peter@peterodding.com>
+# Last Change: October 18, 2026
+# URL: https://pypi.python.org/pypi/update-dotdee
+
+"""
+Immutable memory mapped snapshots of loaded configuration.
+
+Pre-fork servers that create a :class:`~update_dotdee.ConfigLoader` in each
+worker process pay for searching and parsing the configuration files once
+per worker, and each worker ends up with its own copy of the parsed
+configuration. A snapshot avoids both: The parent process loads the
+configuration once and saves it using
+:func:`~update_dotdee.ConfigLoader.save_snapshot()`, after which workers
+(forked or spawned) create a :class:`ConfigSnapshot` object that memory maps
+the snapshot. No parsing is needed to attach to a snapshot and because the
+file is mapped read only its pages are shared by all processes.
+
+Here's an example:
+
+.. code-block:: python
+
+   from update_dotdee import ConfigLoader
+   from update_dotdee.snapshot import ConfigSnapshot
+
+   # In the parent process.
+   ConfigLoader(program_name='my-server').save_snapshot('/run/my-server.snapshot')
+
+   # In each worker process.
+   snapshot = ConfigSnapshot(filename='/run/my-server.snapshot')
+   options = snapshot.get_options('main')
+
+The snapshot format consists of a header, a table of sections sorted by name
+(so that sections can be found using a binary search), a table of options and
+a pool of UTF-8 encoded strings. All integers are unsigned 32 bit little
+endian values and all offsets are relative to the start of the file.
+"""
+
+# Standard library modules.
+import mmap
+import os
+import struct
+
+# External dependencies.
+from humanfriendly.text import format
+from property_manager import PropertyManager, cached_property, required_property
+from six import PY2, text_type
+from six.moves import configparser
+
+MAGIC = b'UDDSNAP1'
+"""The byte string at the start of every snapshot (a byte string)."""
+
+HEADER = struct.Struct('<8sI')
+"""The header of a snapshot: :data:`MAGIC` and the number of sections (a :class:`struct.Struct` object)."""
+
+SECTION = struct.Struct('<IIII')
+"""
+An entry in the section table (a :class:`struct.Struct` object).
+
+Each entry contains the offset and length of the section name and the
+index and number of the section's entries in the option table.
+"""
+
+OPTION = struct.Struct('<IIII')
+"""An entry in the option table: The offset and length of the name and value (a :class:`struct.Struct` object)."""
+
+
+class ConfigSnapshot(PropertyManager):
+
+    """
+    Read only access to a configuration snapshot.
+
+    The :attr:`section_names` property and the :func:`get_options()` method
+    provide the same interface as :class:`~update_dotdee.ConfigLoader`.
+    """
+
+    @required_property
+    def filename(self):
+        """The pathname of the snapshot (a string)."""
+
+    @cached_property
+    def data(self):
+        """
+        The contents of the snapshot (a read only :class:`mmap.mmap` object).
+
+        :raises: :exc:`~exceptions.ValueError` when :attr:`filename` isn't a snapshot.
+        """
+        with open(self.filename, 'rb') as handle:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(data) < HEADER.size or data[:len(MAGIC)] != MAGIC:
+            data.close()
+            raise ValueError(format("Not a configuration snapshot! (%s)", self.filename))
+        return data
+
+    @cached_property
+    def section_count(self):
+        """The number of sections in the snapshot (an integer)."""
+        return HEADER.unpack_from(self.data, 0)[1]
+
+    @cached_property
+    def section_names(self):
+        """The names of the available sections (a sorted list of strings)."""
+        return [self.get_string(*self.get_section(i)[:2]) for i in range(self.section_count)]
+
+    def close(self):
+        """Unmap the snapshot (it is mapped again when it's accessed)."""
+        if 'data' in self.__dict__:
+            self.data.close()
+            del self.data
+
+    def find_section(self, section_name):
+        """
+        Find a section using a binary search.
+
+        :param section_name: The name of a section (a string).
+        :returns: The index of the section (an integer).
+        :raises: :exc:`configparser.NoSectionError` when the section doesn't exist.
+        """
+        encoded_name = encode_string(section_name)
+        low, high = 0, self.section_count
+        while low < high:
+            middle = (low + high) // 2
+            offset, length, _, _ = self.get_section(middle)
+            name = self.data[offset:offset + length]
+            if name < encoded_name:
+                low = middle + 1
+            elif name > encoded_name:
+                high = middle
+            else:
+                return middle
+        raise configparser.NoSectionError(section_name)
+
+    def get_options(self, section_name):
+        """
+        Get the options defined in a specific section.
+
+        :param section_name: The name of the section (a string).
+        :returns: A :class:`dict` with options.
+        :raises: :exc:`configparser.NoSectionError` when the section doesn't exist.
+        """
+        _, _, first, count = self.get_section(self.find_section(section_name))
+        options_offset = HEADER.size + SECTION.size * self.section_count
+        options = {}
+        for index in range(first, first + count):
+            name_offset, name_length, value_offset, value_length = OPTION.unpack_from(
+                self.data, options_offset + OPTION.size * index,
+            )
+            options[self.get_string(name_offset, name_length)] = self.get_string(value_offset, value_length)
+        return options
+
+    def get_section(self, index):
+        """
+        Get an entry in the section table.
+
+        :param index: The index of the section (an integer).
+        :returns: A tuple of four integers (refer to :data:`SECTION`).
+        """
+        return SECTION.unpack_from(self.data, HEADER.size + SECTION.size * index)
+
+    def get_string(self, offset, length):
+        """
+        Get a string from the string pool.
+
+        :param offset: The offset of the string (an integer).
+        :param length: The length of the encoded string (an integer).
+        :returns: The decoded string (on Python 2 the encoded byte string is
+                  returned, because that's what :mod:`configparser` uses).
+        """
+        value = self.data[offset:offset + length]
+        return value if PY2 else value.decode('UTF-8')
+
+    def __enter__(self):
+        """Enable usage of :class:`ConfigSnapshot` objects as context managers."""
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        """Unmap the snapshot when leaving a :keyword:`with` block."""
+        self.close()
+
+
+def encode_string(value):
+    """
+    Encode a string for use in a snapshot.
+
+    :param value: A Unicode string or a byte string.
+    :returns: The UTF-8 encoded byte string.
+
+    On Python 2 :mod:`configparser` returns byte strings, these are
+    passed through unchanged.
+    """
+    return value.encode('UTF-8') if isinstance(value, text_type) else value
+
+
+def write_snapshot(sections, filename):
+    """
+    Save configuration in the snapshot format.
+
+    :param sections: A :class:`dict` that maps section names (strings) to
+                     dictionaries with options (strings).
+    :param filename: The pathname of the snapshot (a string).
+
+    The snapshot is written to a temporary file that is then renamed into
+    place, so processes that are attached to an existing snapshot keep
+    their consistent view of the old snapshot.
+    """
+    encoded_sections = sorted(
+        (encode_string(name), [(encode_string(k), encode_string(v)) for k, v in sorted(options.items())])
+        for name, options in sections.items()
+    )
+    option_count = sum(len(options) for name, options in encoded_sections)
+    pool_offset = HEADER.size + SECTION.size * len(encoded_sections) + OPTION.size * option_count
+    section_table = []
+    option_table = []
+    pool = []
+    pool_size = 0
+    for name, options in encoded_sections:
+        section_table.append(SECTION.pack(pool_offset + pool_size, len(name), len(option_table), len(options)))
+        pool.append(name)
+        pool_size += len(name)
+        for key, value in options:
+            option_table.append(OPTION.pack(
+                pool_offset + pool_size, len(key),
+                pool_offset + pool_size + len(key), len(value),
+            ))
+            pool.extend((key, value))
+            pool_size += len(key) + len(value)
+    temporary_file = '%s.tmp-%i' % (filename, os.getpid())
+    with open(temporary_file, 'wb') as handle:
+        handle.write(HEADER.pack(MAGIC, len(section_table)))
+        handle.write(b"".join(section_table))
+        handle.write(b"".join(option_table))
+        handle.write(b"".join(pool))
+    os.rename(temporary_file, filename)
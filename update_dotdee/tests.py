@@ -1,21 +1,47 @@
 # Generic modular configuration file manager.
 #
 # Author: Peter Odding <peter@peterodding.com>
-# Last Change: May 17, 2020
+# Last Change: October 18, 2026
 # URL: https://pypi.python.org/pypi/update-dotdee
 
 """Test suite for `update-dotdee`."""
 
 # Standard library modules.
+import io
+import json
 import os
+import shutil
+import stat
+import sys
+import threading
+import time
 
 # External dependencies.
+from executor import ExternalCommandFailed
+from executor.contexts import LocalContext, RemoteContext
 from humanfriendly.testing import MockedHomeDirectory, TemporaryDirectory, TestCase, run_cli
 from humanfriendly.text import dedent
+from property_manager import mutable_property
+from six import PY2
 
 # Modules included in our package.
-from update_dotdee import ConfigLoader, UpdateDotDee
-from update_dotdee.cli import main
+import update_dotdee
+from update_dotdee import (
+    STATUS_MODIFIED,
+    STATUS_STALE,
+    STATUS_UP_TO_DATE,
+    ConfigLoader,
+    NoPreviousGeneration,
+    RefuseToOverwrite,
+    UpdateDotDee,
+    count_lines,
+    trim_trailing_whitespace,
+)
+from update_dotdee.benchmarks import main as benchmarks_main
+from update_dotdee.cache import SnippetCache
+from update_dotdee.cli import connect, main
+from update_dotdee.helper import HelperContext, HelperError
+from update_dotdee.multiplexing import MultiplexedConnection
 
 
 class UpdateDotDeeTestCase(TestCase):
@@ -95,6 +121,240 @@ class UpdateDotDeeTestCase(TestCase):
                 assert exec_result in lines
                 assert non_executable in lines
 
+    def test_direct_access(self):
+        """Test that direct access to local files matches the use of an execution context."""
+        # On Python 2 the standard library doesn't provide os.scandir().
+        assert UpdateDotDee(filename='/etc/hosts').direct_access is (update_dotdee.scandir is not None)
+        assert UpdateDotDee(filename='/etc/hosts', context=LocalContext(sudo=True)).direct_access is False
+        with TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, 'config')
+            directory = '%s.d' % filename
+            os.makedirs(directory)
+            write_file(os.path.join(directory, '.hidden'), "Don't include me.\n")
+            write_file(os.path.join(directory, '10-static'), "Static contents.\n")
+            write_file(os.path.join(directory, '2-dynamic'), "#!/bin/sh\necho Dynamic contents.\n")
+            os.chmod(os.path.join(directory, '2-dynamic'), int('755', 8))
+            results = []
+            for direct_access in True, False:
+                program = UpdateDotDee(filename=filename, direct_access=direct_access, force=True)
+                assert program.find_snippets() == [
+                    (os.path.join(directory, '2-dynamic'), True),
+                    (os.path.join(directory, '10-static'), False),
+                ]
+                program.update_file()
+                with open(filename) as handle:
+                    results.append(handle.read())
+            assert results[0] == results[1]
+            assert results[0] == "Dynamic contents.\n\nStatic contents.\n"
+
+    def test_trailing_whitespace(self):
+        """Test that trailing whitespace is trimmed without copying."""
+        for value in b"", b"\n", b"foo", b"foo\n", b"foo\nbar \t\r\n\n", b"  foo  \n\x0b\x0c":
+            trimmed = trim_trailing_whitespace(value)
+            assert bytes(trimmed) == value.rstrip()
+            assert count_lines(value) == len(value.splitlines())
+            if trimmed == value:
+                assert trimmed is value
+            elif not PY2:
+                assert isinstance(trimmed, memoryview)
+                assert trimmed.obj is value
+
+    def test_asyncio_update(self):
+        """Test the :mod:`asyncio` variant of :class:`UpdateDotDee`."""
+        if sys.version_info[:2] < (3, 7):
+            return self.skipTest("requires asyncio.run() (Python 3.7+)")
+        import asyncio
+        from update_dotdee.aio import AsyncUpdateDotDee
+        with TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, 'config')
+            directory = '%s.d' % filename
+            write_file(filename, "Original content.\n")
+            UpdateDotDee(filename=filename).update_file()
+            for number in range(1, 21):
+                write_file(os.path.join(directory, '%i.conf' % number), "Snippet %i.\n" % number)
+            write_file(os.path.join(directory, '15.conf'), "#!/bin/sh\necho Generated.\n")
+            os.chmod(os.path.join(directory, '15.conf'), int('755', 8))
+            UpdateDotDee(filename=filename).update_file()
+            with open(filename) as handle:
+                expected_contents = handle.read()
+            for direct_access in True, False:
+                program = AsyncUpdateDotDee(filename=filename, direct_access=direct_access, concurrency=3)
+                asyncio.run(program.update_file())
+                with open(filename) as handle:
+                    assert handle.read() == expected_contents
+                assert program.old_checksum == program.new_checksum
+            # Generations are retained.
+            program = AsyncUpdateDotDee(filename=filename, generations=3)
+            asyncio.run(program.update_file())
+            assert [g[2] for g in program.find_generations()] == [program.old_checksum]
+            # Local modifications should be detected.
+            write_file(filename, "Not the same thing.\n")
+            program = AsyncUpdateDotDee(filename=filename, direct_access=False)
+            self.assertRaises(RefuseToOverwrite, asyncio.run, program.update_file())
+
+    def test_asyncio_config_loader(self):
+        """Test the :mod:`asyncio` variant of :class:`ConfigLoader`."""
+        if sys.version_info[:2] < (3, 7):
+            return self.skipTest("requires asyncio.run() (Python 3.7+)")
+        import asyncio
+        from update_dotdee.aio import AsyncConfigLoader
+        with TemporaryDirectory() as directory:
+            filenames = []
+            for number in range(1, 11):
+                filenames.append(os.path.join(directory, '%i.ini' % number))
+                write_file(filenames[-1], "[section-%i]\nkey = value\n\n[main]\noverride = %i\n" % (number, number))
+            loader = AsyncConfigLoader(available_files=filenames, concurrency=2)
+            asyncio.run(loader.load())
+            assert loader.section_names == ConfigLoader(available_files=filenames).section_names
+            assert loader.get_options('main') == dict(override='10')
+
+    def test_snippet_cache(self):
+        """Test that remote snippets are cached based on their metadata."""
+        with TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, 'config')
+            directory = '%s.d' % filename
+            cache_directory = os.path.join(temporary_directory, 'cache')
+            os.makedirs(directory)
+            for number in range(1, 6):
+                write_file(os.path.join(directory, '%i.conf' % number), "Snippet %i.\n" % number)
+            write_file(os.path.join(directory, '6.conf'), "#!/bin/sh\necho Generated.\n")
+            os.chmod(os.path.join(directory, '6.conf'), int('755', 8))
+            context = ReadCountingContext()
+            cache = SnippetCache(directory=cache_directory)
+            # The first run populates the cache.
+            UpdateDotDee(filename=filename, context=context, cache=cache).update_file()
+            assert len([fn for fn in context.files_read if fn.endswith('.conf')]) == 5
+            assert len(os.listdir(cache_directory)) == 5
+            with open(filename) as handle:
+                assert handle.read().splitlines()[-1] == "Generated."
+            # The second run only reads the snippet that changed.
+            del context.files_read[:]
+            write_file(os.path.join(directory, '3.conf'), "Modified snippet.\n")
+            UpdateDotDee(filename=filename, context=context, cache=cache).update_file()
+            assert [fn for fn in context.files_read if fn.endswith('.conf')] == [
+                os.path.join(directory, '3.conf'),
+            ]
+            with open(filename) as handle:
+                assert "Modified snippet." in handle.read()
+            # Cache entries are private.
+            assert stat.S_IMODE(os.stat(cache_directory).st_mode) == 0o700
+            for name in os.listdir(cache_directory):
+                assert stat.S_IMODE(os.stat(os.path.join(cache_directory, name)).st_mode) == 0o600
+            # Concurrent reads can populate an empty cache.
+            shutil.rmtree(cache_directory)
+            program = UpdateDotDee(filename=filename, context=ReadCountingContext(), cache=cache, read_concurrency=6)
+            program.update_file()
+            assert len(os.listdir(cache_directory)) == 5
+            # Evict least recently used entries (there are now four entries
+            # of 11 bytes and one of 18 bytes).
+            cache.max_size = 40
+            assert cache.evict() == 2
+            assert len(os.listdir(cache_directory)) == 3
+
+    def test_connection_multiplexing(self):
+        """Test that remote commands are routed over a shared SSH connection."""
+        with TemporaryDirectory() as temporary_directory:
+            # Create a fake SSH client that logs its command line arguments.
+            log_file = os.path.join(temporary_directory, 'ssh.log')
+            ssh_client = os.path.join(temporary_directory, 'ssh')
+            write_file(ssh_client, '#!/bin/sh\necho "$@" >> %s\n' % log_file)
+            os.chmod(ssh_client, int('755', 8))
+            context = RemoteContext(ssh_alias='server', ssh_command=[ssh_client])
+            with MultiplexedConnection(context=context) as connection:
+                assert os.path.isdir(connection.control_directory)
+                control_path = connection.control_path
+                assert 'ControlPath=%s' % control_path in context.options['ssh_command']
+                context.execute('true')
+            assert context.options['ssh_command'] == [ssh_client]
+            assert not os.path.exists(control_path)
+            with open(log_file) as handle:
+                master, command, stop = handle.read().splitlines()
+            assert 'ControlMaster=yes' in master and '-N' in master
+            assert 'ControlPersist=60' in master
+            assert 'ControlMaster=no' in command and command.endswith('true')
+            assert '-O exit' in stop
+            # The command line interface falls back to separate connections.
+            context = RemoteContext(ssh_alias='server', ssh_command=['false'])
+            control_directory = os.path.join(temporary_directory, 'control')
+            os.mkdir(control_directory)
+            connection = MultiplexedConnection(context=context, control_directory=control_directory)
+            self.assertRaises(ExternalCommandFailed, connection.open)
+            assert not os.path.exists(control_directory)
+            with connect(context):
+                assert context.options['ssh_command'] == ['false']
+
+    def test_compressed_transfer(self):
+        """Test that files can be transferred in compressed form."""
+        with TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, 'config')
+            directory = '%s.d' % filename
+            os.makedirs(directory)
+            large_snippet = "".join("allow 10.0.%i.%i\n" % (i // 256, i % 256) for i in range(1000))
+            write_file(os.path.join(directory, '1-large'), large_snippet)
+            write_file(os.path.join(directory, '2-small'), "Small snippet.\n")
+            context = ReadCountingContext()
+            program = UpdateDotDee(filename=filename, context=context, compression_threshold=1024)
+            assert program.direct_access is False
+            assert program.load_file(os.path.join(directory, '2-small')) == b"Small snippet.\n"
+            program.update_file()
+            # Snippets are read using the compressed read script.
+            assert context.files_read == []
+            with open(filename) as handle:
+                assert handle.read() == large_snippet + "\nSmall snippet.\n"
+            assert program.old_checksum == program.new_checksum
+            # Compressed output is also decompressed without a memoryview (Python 2).
+            update_dotdee.PY2 = True
+            try:
+                assert program.load_file(os.path.join(directory, '1-large')) == large_snippet.encode('ascii')
+            finally:
+                update_dotdee.PY2 = PY2
+        # Test the command line option (the helper process disables direct access).
+        with TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, 'config')
+            write_file(filename, large_snippet)
+            returncode, output = run_cli(main, '-vv', '--use-helper', '--compress', filename, merged=True)
+            assert returncode == 0
+            assert "Received 16560 bytes in" in output
+            assert "Sending 16560 bytes in" in output
+            with open(filename) as handle:
+                assert handle.read() == large_snippet
+
+    def test_helper_context(self):
+        """Test that all operations can be routed through a single helper process."""
+        with TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, 'config')
+            directory = '%s.d' % filename
+            write_file(filename, "Original content.\n")
+            with HelperContext(context=LocalContext()) as context:
+                program = UpdateDotDee(filename=filename, context=context)
+                assert program.direct_access is False
+                # Initialize the directory.
+                program.update_file()
+                assert os.path.isfile(os.path.join(directory, 'local'))
+                # Add a static and an executable snippet.
+                write_file(os.path.join(directory, 'static'), "Static contents.\n")
+                write_file(os.path.join(directory, 'dynamic'), "#!/bin/sh\necho Dynamic contents.\n")
+                os.chmod(os.path.join(directory, 'dynamic'), int('755', 8))
+                program.update_file()
+                assert program.old_checksum == program.new_checksum
+                # All of the above was done by a single process.
+                helper_pid = context.process.pid
+                assert context.capture('sh', '-c', 'echo $PPID') == str(helper_pid)
+                self.assertRaises(HelperError, context.read_file, os.path.join(directory, 'missing'))
+                self.assertRaises(ExternalCommandFailed, context.execute, 'false')
+            assert context.process is None
+            with open(filename) as handle:
+                assert handle.read() == "Dynamic contents.\n\nOriginal content.\n\nStatic contents.\n"
+        # Test the command line option.
+        with TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, 'config')
+            write_file(filename, "Original content.\n")
+            returncode, output = run_cli(main, '-vv', '--use-helper', filename, merged=True)
+            assert returncode == 0
+            assert "Starting helper process" in output
+            assert "Stopping helper process" in output
+            assert os.path.isfile(os.path.join('%s.d' % filename, 'local'))
+
     def test_create_directory(self):
         """Test that the ``.d`` directory is created on the first run."""
         expected_contents = "This content should be preserved.\n"
@@ -165,6 +425,119 @@ class UpdateDotDeeTestCase(TestCase):
             # Sanity check that the persisted checksum matches a checksum computed at runtime.
             assert program.old_checksum == program.new_checksum
 
+    def test_check_mode(self):
+        """Test that the status of a generated file can be checked without changing anything."""
+        with TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, 'config')
+            directory = '%s.d' % filename
+            write_file(filename, "Original content.\n")
+            # The directory isn't created by --check.
+            returncode, output = run_cli(main, '--check', filename)
+            assert returncode == 2
+            assert not os.path.exists(directory)
+            assert os.listdir(temporary_directory) == ['config']
+            # After the first update the file is up to date.
+            program = UpdateDotDee(filename=filename)
+            program.update_file()
+            assert program.check_file() == STATUS_UP_TO_DATE
+            # With direct access no external commands are needed.
+            context = CommandCountingContext()
+            checker = UpdateDotDee(filename=filename, context=context, direct_access=True)
+            assert checker.check_file() == STATUS_UP_TO_DATE
+            assert context.commands == []
+            returncode, output = run_cli(main, '--check', filename)
+            assert returncode == 0
+            # Changes to the .d directory make the file stale.
+            write_file(os.path.join(directory, 'extra'), "Extra content.\n")
+            assert program.check_file() == STATUS_STALE
+            returncode, output = run_cli(main, '--check', filename)
+            assert returncode == 2
+            with open(filename) as handle:
+                assert handle.read() == "Original content.\n"
+            # Local changes take precedence over stale snippets.
+            write_file(filename, "Modified content.\n")
+            assert program.check_file() == STATUS_MODIFIED
+            returncode, output = run_cli(main, '--check', filename)
+            assert returncode == 3
+            with open(filename) as handle:
+                assert handle.read() == "Modified content.\n"
+            # The saved checksum is read through the context when direct access isn't used.
+            assert UpdateDotDee(filename=filename, direct_access=False).check_file() == STATUS_MODIFIED
+            os.unlink(program.checksum_file)
+            for direct_access in True, False:
+                assert UpdateDotDee(filename=filename, direct_access=direct_access).check_file() == STATUS_STALE
+
+    def test_concurrent_reads(self):
+        """Test that snippets can be read concurrently without changing their order."""
+        with TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, 'config')
+            directory = '%s.d' % filename
+            os.makedirs(directory)
+            for number in range(1, 21):
+                write_file(os.path.join(directory, '%i.conf' % number), "Snippet %i.\n" % number)
+            write_file(os.path.join(directory, '5.conf'), "#!/bin/sh\necho Generated.\n")
+            os.chmod(os.path.join(directory, '5.conf'), int('755', 8))
+            results = []
+            for read_concurrency in 1, 4:
+                context = SlowReadContext()
+                program = UpdateDotDee(filename=filename, context=context, read_concurrency=read_concurrency)
+                program.update_file(force=True)
+                assert (context.max_active > 1) == (read_concurrency > 1)
+                with open(filename) as handle:
+                    results.append(handle.read())
+            assert results[0] == results[1]
+            assert results[0].splitlines()[8] == "Generated."
+
+    def test_generations(self):
+        """Test that previous generations are retained and can be restored."""
+        for direct_access in True, False:
+            with TemporaryDirectory() as temporary_directory:
+                filename = os.path.join(temporary_directory, 'config')
+                directory = '%s.d' % filename
+                os.makedirs(directory)
+                program = UpdateDotDee(filename=filename, generations=2, direct_access=direct_access)
+                for number in range(1, 4):
+                    write_file(os.path.join(directory, 'snippet'), "Generation %i.\n" % number)
+                    program.update_file()
+                    # Unchanged output doesn't create new generations.
+                    program.update_file()
+                assert [g[0] for g in program.find_generations()] == [2, 3]
+                # Roll back twice.
+                assert program.rollback() == 2
+                with open(filename) as handle:
+                    assert handle.read() == "Generation 2.\n"
+                assert program.check_file() == STATUS_STALE
+                self.assertRaises(NoPreviousGeneration, program.rollback)
+                # Local modifications are respected.
+                program.update_file()
+                write_file(filename, "Modified.\n")
+                self.assertRaises(RefuseToOverwrite, program.rollback)
+                assert program.rollback(force=True) == 2
+        # Test the command line options.
+        with TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, 'config')
+            write_file(filename, "Original content.\n")
+            assert run_cli(main, '--generations=5', filename)[0] == 0
+            write_file(os.path.join('%s.d' % filename, 'local'), "New content.\n")
+            assert run_cli(main, '--generations=5', filename)[0] == 0
+            assert run_cli(main, '--rollback', filename)[0] == 0
+            with open(filename) as handle:
+                assert handle.read() == "Original content.\n"
+
+    def test_profiling(self):
+        """Test that the command line interface can profile a run including imports."""
+        import pstats
+        with TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, 'config')
+            profile_file = os.path.join(temporary_directory, 'update-dotdee.prof')
+            write_file(filename, "Original content.\n")
+            returncode, output = run_cli(main, '--profile=%s' % profile_file, filename)
+            assert returncode == 0
+            assert os.path.isfile(os.path.join('%s.d' % filename, 'local'))
+            profiled_files = set(key[0] for key in pstats.Stats(profile_file).stats)
+            assert any(fn.endswith(os.path.join('update_dotdee', 'cli.py')) for fn in profiled_files)
+            assert any(fn.endswith(os.path.join('update_dotdee', '__init__.py')) for fn in profiled_files)
+
     def test_config_loader(self):
         """Tests for the :class:`ConfigLoader` class."""
         # Test support for custom filename extensions.
@@ -219,6 +592,197 @@ class UpdateDotDeeTestCase(TestCase):
                 'modular-option': 'value',
             }
 
+    def test_config_refresh(self):
+        """Test that refreshing the configuration only parses files that changed."""
+        from six.moves import configparser
+        with TemporaryDirectory() as temporary_directory:
+            modular_directory = os.path.join(temporary_directory, 'program.d')
+            os.makedirs(modular_directory)
+            write_file(os.path.join(temporary_directory, 'program.ini'), dedent('''
+                [DEFAULT]
+                shared = main
+
+                [main]
+                option = main
+            '''))
+            for number in range(1, 6):
+                write_file(os.path.join(modular_directory, '%i.ini' % number), dedent('''
+                    [DEFAULT]
+                    shared = {number}
+
+                    [section-{number}]
+                    option = {number}
+
+                    [main]
+                    option = {number}
+                ''', number=number))
+            loader = ParseCountingConfigLoader(program_name='program', base_directories=[temporary_directory])
+            assert loader.get_options('main') == dict(option='5', shared='5')
+            assert len(loader.files_parsed) == 6
+            # The merged configuration matches sequential parsing.
+            reference = configparser.RawConfigParser()
+            for filename in loader.available_files:
+                reference.read(filename)
+            assert loader.section_names == sorted(reference.sections())
+            for section_name in loader.section_names:
+                assert loader.get_options(section_name) == dict(reference.items(section_name))
+            # Change, add and remove files.
+            del loader.files_parsed[:]
+            write_file(os.path.join(modular_directory, '3.ini'), "[section-3]\noption = changed\n")
+            write_file(os.path.join(modular_directory, '6.ini'), "[section-6]\noption = added\n")
+            os.unlink(os.path.join(modular_directory, '5.ini'))
+            loader.refresh()
+            assert sorted(os.path.basename(fn) for fn in loader.files_parsed) == ['3.ini', '6.ini']
+            assert loader.get_options('section-3') == dict(option='changed', shared='4')
+            assert loader.get_options('section-6') == dict(option='added', shared='4')
+            assert loader.get_options('main') == dict(option='4', shared='4')
+            assert 'section-5' not in loader.section_names
+            assert len(loader.parsed_files) == 6
+            # Explicitly set files aren't replaced by searching again.
+            loader.available_files = loader.available_files[:2]
+            loader.refresh()
+            assert loader.get_options('main') == dict(option='1', shared='1')
+
+    def test_config_snapshot(self):
+        """Test that loaded configuration can be saved to and read from a snapshot."""
+        from six.moves import configparser
+        from update_dotdee.snapshot import ConfigSnapshot, write_snapshot
+        with TemporaryDirectory() as temporary_directory:
+            filenames = []
+            for number in range(1, 11):
+                filenames.append(os.path.join(temporary_directory, '%i.ini' % number))
+                write_file(filenames[-1], "[section-%i]\nkey = value %i\n\n[main]\noverride = %i\n" % (
+                    number, number, number,
+                ))
+            with io.open(filenames[-1], 'a', encoding='UTF-8') as handle:
+                handle.write(u"[DEFAULT]\ndefault = yes\n\n[unicode]\nname = \u00e9t\u00e9\n")
+            loader = ConfigLoader(available_files=filenames)
+            snapshot_file = os.path.join(temporary_directory, 'config.snapshot')
+            with loader.save_snapshot(snapshot_file) as snapshot:
+                assert snapshot.section_names == loader.section_names
+                for section_name in loader.section_names:
+                    assert snapshot.get_options(section_name) == loader.get_options(section_name)
+                assert snapshot.get_options('main') == dict(default='yes', override='10')
+                self.assertRaises(configparser.NoSectionError, snapshot.get_options, 'missing')
+            # Byte strings (returned by configparser on Python 2) are stored as is.
+            write_snapshot({b'bytes': {b'name': u"\u00e9t\u00e9".encode('UTF-8')}}, snapshot_file)
+            with ConfigSnapshot(filename=snapshot_file) as snapshot:
+                assert snapshot.get_options('bytes') == dict(name=loader.get_options('unicode')['name'])
+            # Other files are rejected.
+            self.assertRaises(ValueError, getattr, ConfigSnapshot(filename=filenames[0]), 'section_names')
+
+    def test_object_construction(self):
+        """Test that the low overhead initializer validates keyword arguments."""
+        loader = ConfigLoader(program_name='update-dotdee', filename_extension='.conf', strict=True)
+        assert loader.program_name == 'update-dotdee'
+        assert loader.filename_extension == '.conf'
+        assert loader.strict is True
+        program = UpdateDotDee(filename='/etc/hosts', force=True)
+        assert program.directory == '/etc/hosts.d'
+        assert program.checksum_file == '/etc/hosts.d/.checksum'
+        assert program.force is True
+        self.assertRaises(TypeError, ConfigLoader, unknown_option=True)
+        self.assertRaises(TypeError, UpdateDotDee, force=True)
+        # Subclasses get their own property names.
+        assert ExtendedUpdateDotDee(filename='/etc/hosts', extra_option=2).extra_option == 2
+        self.assertRaises(TypeError, UpdateDotDee, filename='/etc/hosts', extra_option=2)
+        self.assertRaises(TypeError, ExtendedUpdateDotDee, extra_option=2)
+
+    def test_benchmarks(self):
+        """Smoke test for the benchmark suite."""
+        with TemporaryDirectory() as temporary_directory:
+            results_file = os.path.join(temporary_directory, 'results.json')
+            for i in range(2):
+                returncode, output = run_cli(
+                    benchmarks_main, '--repeat=1', '--workload=snippets-10',
+                    '--workload=ini-10', '--output=%s' % results_file,
+                    '--compare=%s' % results_file,
+                )
+                assert returncode == 0
+                assert 'snippets-10' in output
+            with open(results_file) as handle:
+                runs = json.load(handle)
+            assert len(runs) == 2
+            assert set(runs[-1]['results']) == set(['snippets-10', 'ini-10'])
+
+
+class ExtendedUpdateDotDee(UpdateDotDee):
+
+    """Subclass of :class:`~update_dotdee.UpdateDotDee` that adds a property."""
+
+    @mutable_property
+    def extra_option(self):
+        """An additional property (defaults to :data:`None`)."""
+
+
+class ParseCountingConfigLoader(ConfigLoader):
+
+    """Configuration loader that keeps track of the files that are parsed."""
+
+    def __init__(self, **kw):
+        """Initialize the list of files that were parsed."""
+        self.files_parsed = []
+        super(ParseCountingConfigLoader, self).__init__(**kw)
+
+    def parse_file(self, filename):
+        """Remember the filename before parsing the file."""
+        self.files_parsed.append(filename)
+        return super(ParseCountingConfigLoader, self).parse_file(filename)
+
+
+class CommandCountingContext(LocalContext):
+
+    """Execution context that keeps track of the external commands that are executed."""
+
+    def __init__(self, *args, **kw):
+        """Initialize the list of commands that were executed."""
+        super(CommandCountingContext, self).__init__(*args, **kw)
+        self.commands = []
+
+    def prepare_command(self, command, options):
+        """Remember the command before preparing it."""
+        self.commands.append(command)
+        return super(CommandCountingContext, self).prepare_command(command, options)
+
+
+class ReadCountingContext(LocalContext):
+
+    """Execution context that keeps track of the files that are read."""
+
+    def __init__(self, *args, **kw):
+        """Initialize the list of files that were read."""
+        super(ReadCountingContext, self).__init__(*args, **kw)
+        self.files_read = []
+
+    def read_file(self, filename, **options):
+        """Remember the filename before reading the file."""
+        self.files_read.append(filename)
+        return super(ReadCountingContext, self).read_file(filename, **options)
+
+
+class SlowReadContext(LocalContext):
+
+    """Execution context that simulates a high latency filesystem."""
+
+    def __init__(self, *args, **kw):
+        """Initialize the counters."""
+        super(SlowReadContext, self).__init__(*args, **kw)
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def read_file(self, filename, **options):
+        """Read a file after a short delay, keeping track of concurrent reads."""
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.active, self.max_active)
+        try:
+            time.sleep(0.01)
+            return super(SlowReadContext, self).read_file(filename, **options)
+        finally:
+            with self.lock:
+                self.active -= 1
+
 
 def write_file(filename, contents=''):
     """Shortcut to create files."""